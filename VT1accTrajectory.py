@@ -1,11 +1,14 @@
-import xml.etree.ElementTree as ET
 import math
+import numpy as np
+from vt1_traj_core import Traj, point_dict, compute_kin, kinematics, extract_vertices, emit_xosc
+
+# 是否逐个打印输出的 Vertex。终端逐行刷新往往比计算本身还慢，默认只打印摘要
+VERBOSE = False
 
 def calculate_trajectory_points(xosc_file):
     print(f"正在读取文件: {xosc_file} ...")
     try:
-        tree = ET.parse(xosc_file)
-        root = tree.getroot()
+        traj_name, raw_list, other_traj_names = extract_vertices(xosc_file, 'VT1_Trajectory')
     except Exception as e:
         print(f"读取XML出错: {e}")
         return
@@ -14,26 +17,26 @@ def calculate_trajectory_points(xosc_file):
     ACC = 1.5                # 加速度 m/s^2
     TARGET_SPEED_KMH = 15.0  # 目标速度 km/h
     TARGET_SPEED_MS = TARGET_SPEED_KMH / 3.6 # 换算为 m/s (约 4.167)
-    
+
     # 新的起点和原始起点
     NEW_START_X = -327.68
     NEW_START_Y = 122.16
     ORIGINAL_START_X = -332.0
     ORIGINAL_START_Y = 118.0
-    
+
     # 计算加速阶段的参数
     acc_distance = (TARGET_SPEED_MS ** 2) / (2 * ACC)
     acc_time_duration = TARGET_SPEED_MS / ACC
-    
+
     # 计算从新起点到原始起点的距离和方向
     dx_total = ORIGINAL_START_X - NEW_START_X
     dy_total = ORIGINAL_START_Y - NEW_START_Y
-    distance_to_original = math.sqrt(dx_total**2 + dy_total**2)
-    
+    distance_to_original = math.hypot(dx_total, dy_total)
+
     # 单位方向向量
     dir_x = dx_total / distance_to_original
     dir_y = dy_total / distance_to_original
-    
+
     # 计算方向角
     heading_to_original = math.atan2(dy_total, dx_total)
 
@@ -46,174 +49,103 @@ def calculate_trajectory_points(xosc_file):
     print(f"------------------\n")
 
     # ================= 1. 提取原始几何点 =================
-    raw_points = []
-    
     # 查找 "VT1_Trajectory" 的轨迹节点
     # 在 OpenSCENARIO 中，轨迹在 FollowTrajectoryAction 中
-    trajectory_node = None
-    for traj in root.iter():
-        traj_name = traj.get('name')
-        if traj_name and 'VT1_Trajectory' in traj_name:
-            trajectory_node = traj
-            print(f"找到轨迹: {traj_name}")
-            break
-            
-    if not trajectory_node:
+    if traj_name is None:
         print("错误：在XML中找不到 'VT1_Trajectory'！")
         print("正在列出所有 Trajectory...")
-        for traj in root.iter():
-            if traj.get('name') and 'Trajectory' in traj.get('name'):
-                print(f"  - {traj.get('name')}")
+        for name in other_traj_names:
+            print(f"  - {name}")
         return
+    print(f"找到轨迹: {traj_name}")
 
-    # 遍历该轨迹下所有的 Vertex
-    # Vertex 是 Polyline 的子节点
-    for vertex in trajectory_node.iter():
-        if 'Vertex' in vertex.tag:
-            # WorldPosition 在 Position 中
-            pos = None
-            for child in vertex.iter():
-                if 'WorldPosition' in child.tag:
-                    pos = child
-                    break
-            
-            if pos is not None:
-                try:
-                    p = {
-                        "x": float(pos.get('x')),
-                        "y": float(pos.get('y')),
-                        "h_rad": float(pos.get('h'))
-                    }
-                    raw_points.append(p)
-                except (TypeError, ValueError):
-                    continue
-
-    total_raw_points = len(raw_points)
+    # 原始几何点同样存成平行数组 (SoA)
+    raw_arr = np.array(raw_list)
+    raw_x, raw_y, raw_h = raw_arr[:, 0], raw_arr[:, 1], raw_arr[:, 2]
+
+    total_raw_points = raw_x.size
     print(f"提取到原始路径点数: {total_raw_points}")
-    
+
     # 限制只使用前183个点（原始轨迹）
     if total_raw_points > 183:
-        raw_points = raw_points[:183]
+        raw_x, raw_y, raw_h = raw_x[:183], raw_y[:183], raw_h[:183]
         total_raw_points = 183
         print(f"限制为前183个点（原始轨迹）")
-    
-    print(f"原始轨迹第一个点: ({raw_points[0]['x']:.2f}, {raw_points[0]['y']:.2f})")
-    print(f"原始轨迹最后一个点: ({raw_points[-1]['x']:.2f}, {raw_points[-1]['y']:.2f})")
+
+    print(f"原始轨迹第一个点: ({raw_x[0]:.2f}, {raw_y[0]:.2f})")
+    print(f"原始轨迹最后一个点: ({raw_x[-1]:.2f}, {raw_y[-1]:.2f})")
     print()
 
     # ================= 2. 生成从新起点到原始起点的加速段 =================
-    final_points = []
-    
-    # 辅助函数：弧度转角度
-    def rad_to_deg(r):
-        return r * (180 / math.pi)
-    
     # 步长：0.1 m 间隔
     step_size = 0.1
     num_steps = int(distance_to_original / step_size)
-    
-    for step in range(num_steps + 1):
-        progress = min(step / num_steps, 1.0) if num_steps > 0 else 1.0
-        
-        # 当前点位置
-        curr_x = NEW_START_X + dx_total * progress
-        curr_y = NEW_START_Y + dy_total * progress
-        curr_distance = distance_to_original * progress
-        
-        # 计算运动状态（从新起点开始加速）
-        if curr_distance <= acc_distance:
-            # 加速段
-            current_time = math.sqrt(2 * curr_distance / ACC) if curr_distance > 0 else 0.0
-            current_vel = ACC * current_time
-            current_stage = "加速中"
-        else:
-            # 到达原始起点时已达目标速度，之后匀速
-            dist_in_cruise = curr_distance - acc_distance
-            time_in_cruise = dist_in_cruise / TARGET_SPEED_MS
-            current_time = acc_time_duration + time_in_cruise
-            current_vel = TARGET_SPEED_MS
-            current_stage = "匀速"
-        
-        final_points.append({
-            "time": round(current_time, 3),
-            "x": curr_x,
-            "y": curr_y,
-            "heading": round(rad_to_deg(heading_to_original), 2),
-            "h_rad": heading_to_original,
-            "velocity": round(current_vel, 2),
-            "acc": ACC if current_stage == "加速中" else 0.0,
-            "stage": current_stage
-        })
-    
+
+    # 整段加速轨迹一次性向量化生成：位置/距离由数组运算，运动学交给 JIT 核
+    prog = np.linspace(0.0, 1.0, num_steps + 1) if num_steps > 0 else np.array([1.0])
+    seg1_x = NEW_START_X + dx_total * prog
+    seg1_y = NEW_START_Y + dy_total * prog
+    curr_dist_arr = distance_to_original * prog
+
+    # 加速段: t = sqrt(2d/a)；到达加速距离后匀速: t = t_acc + (d - d_acc)/v
+    seg1_t, seg1_v, seg1_stage = compute_kin(
+        curr_dist_arr, acc_distance, ACC, TARGET_SPEED_MS, acc_time_duration)
+    seg1_t = np.round(seg1_t, 3)
+    seg1_h = np.full(seg1_t.size, heading_to_original)
+    seg1_acc = np.where(seg1_stage == 0, ACC, 0.0)
+
     # 记录到达原始起点时的时间
-    time_at_original_start = final_points[-1]['time']
-    print(f"到达原始起点时: 时间={time_at_original_start:.3f}s, 速度={final_points[-1]['velocity']:.2f} m/s\n")
+    time_at_original_start = float(seg1_t[-1])
+    print(f"到达原始起点时: 时间={time_at_original_start:.3f}s, 速度={seg1_v[-1]:.2f} m/s\n")
 
     # ================= 3. 添加原始轨迹（以匀速4.17m/s继续）=================
     # 第二段直接以目标速度匀速行驶，不重新加速
-    for i in range(total_raw_points):
-        curr_p = raw_points[i]
-        
-        # 计算从起点到当前点的累积距离
-        cumulative_distance = 0.0
-        for j in range(1, i + 1):
-            prev_p = raw_points[j - 1]
-            dx = raw_points[j]['x'] - prev_p['x']
-            dy = raw_points[j]['y'] - prev_p['y']
-            cumulative_distance += math.sqrt(dx*dx + dy*dy)
-        
-        # 以匀速速度计算时间（从原始起点开始）
-        time_from_original = cumulative_distance / TARGET_SPEED_MS
-        
-        # 总时间 = 加速段时间 + 原始轨迹上的时间
-        final_time = time_at_original_start + time_from_original
-        
-        final_points.append({
-            "time": round(final_time, 3),
-            "x": curr_p['x'],
-            "y": curr_p['y'],
-            "heading": round(rad_to_deg(curr_p['h_rad']), 2),
-            "h_rad": curr_p['h_rad'],
-            "velocity": round(TARGET_SPEED_MS, 2),  # 始终保持目标速度
-            "acc": 0.0,  # 匀速，加速度为0
-            "stage": "匀速"
-        })
+    # 段长 + 前缀和 + 逐点运动学全部在一个并行 JIT 核里完成
+    # (acc_dist=0 → 纯匀速；时间从加速段结束时刻继续累计)
+    seg2_t, seg2_v, seg2_acc, seg2_stage = kinematics(
+        raw_x, raw_y, ACC, TARGET_SPEED_MS, 0.0, 0.0, time_at_original_start)
+    seg2_t = np.round(seg2_t, 3)
+
+    # 组装完整轨迹 (SoA)
+    traj = Traj(
+        t=np.concatenate((seg1_t, seg2_t)),
+        x=np.concatenate((seg1_x, raw_x)),
+        y=np.concatenate((seg1_y, raw_y)),
+        h=np.concatenate((seg1_h, raw_h)),
+        v=np.concatenate((seg1_v, seg2_v)),
+        acc=np.concatenate((seg1_acc, seg2_acc)),
+        stage=np.concatenate((seg1_stage, seg2_stage))
+    )
+    total_n = traj.t.size
 
     # ================= 4. 输出检查 =================
     print("\n--- 计算结果预览 (前5个点) ---")
-    for p in final_points[:5]:
-        print(p)
+    for i in range(5):
+        print(point_dict(traj, i))
 
     print("\n--- 计算结果预览 (中间点) ---")
-    mid_idx = len(final_points) // 2
-    print(final_points[mid_idx])
+    mid_idx = total_n // 2
+    print(point_dict(traj, mid_idx))
 
     print("\n--- 计算结果预览 (最后5个点) ---")
-    for p in final_points[-5:]:
-        print(p)
+    for i in range(total_n - 5, total_n):
+        print(point_dict(traj, i))
 
+    last_p = point_dict(traj, total_n - 1)
     print(f"\n统计:")
-    print(f"总点数: {len(final_points)}")
-    print(f"总耗时: {final_points[-1]['time']} 秒")
-    print(f"最终速度: {final_points[-1]['velocity']} m/s (应接近 {TARGET_SPEED_MS:.3f})")
+    print(f"总点数: {total_n}")
+    print(f"总耗时: {last_p['time']} 秒")
+    print(f"最终速度: {last_p['velocity']} m/s (应接近 {TARGET_SPEED_MS:.3f})")
 
     # ================= 5. 输出 XOSC 格式 =================
-    print(f"\n--- XOSC 格式的 Vertex 点 ---\n")
-    
-    xosc_output = []
-    for point in final_points:
-        vertex_str = f'<Vertex time="{point["time"]:.4f}">\n'
-        vertex_str += f'    <Position><WorldPosition x="{point["x"]:.4f}" y="{point["y"]:.4f}" z="0" h="{point["h_rad"]:.4f}"/></Position>\n'
-        vertex_str += '</Vertex>'
-        xosc_output.append(vertex_str)
-        print(vertex_str)
-    
+    if VERBOSE:
+        print(f"\n--- XOSC 格式的 Vertex 点 ---\n")
+
     # 保存到文件
     output_file = "VT1_trajectory_output.txt"
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write('\n'.join(xosc_output))
-    
+    emit_xosc(traj, output_file, echo=VERBOSE)
+
     print(f"\n已保存到文件: {output_file}")
 
 # 运行
-calculate_trajectory_points("Roundabout_20260203_full.xosc")
\ No newline at end of file
+calculate_trajectory_points("Roundabout_20260203_full.xosc")
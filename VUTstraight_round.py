@@ -1,4 +1,5 @@
 import math
+import numpy as np
 import matplotlib.pyplot as plt
 
 # ================= 配置 =================
@@ -20,7 +21,14 @@ CENTER_Y = 100.73
 RADIUS = 13#原10.12
 
 # 目标：停在环岛正下方
-BOTTOM_ANGLE = -math.pi / 2 
+BOTTOM_ANGLE = -math.pi / 2
+
+# 入环过渡曲线固定采 25 个点：Bernstein 基及导数基只在模块加载时算一次
+CURVE_STEPS = 25
+_T = np.linspace(1.0 / CURVE_STEPS, 1.0, CURVE_STEPS)
+_MT = 1 - _T
+_B = np.stack([_MT**3, 3*_MT**2*_T, 3*_MT*_T**2, _T**3], axis=1)   # (25, 4)
+_BD = np.stack([3*_MT**2, 6*_MT*_T, 3*_T**2], axis=1)              # (25, 3)
 
 # ================= 核心工具函数 =================
 
@@ -34,7 +42,6 @@ def get_circle_pt(angle):
     return x, y, h
 
 def generate_trajectory():
-    points = []
     current_t = 0.0
     speed_mps = VUT_SPEED_KMH / 3.6
     
@@ -45,51 +52,56 @@ def generate_trajectory():
     
     # --- 第2步：生成直行段 (Straight) ---
     steps_straight = int(best_straight_len / (speed_mps * DT))
-    p_end_straight = (0,0,0) 
-    
+    p_end_straight = (0,0,0)
+
+    # 点数可以事先算出，直接按目标长度预分配，避免 append 反复扩容搬迁
+    points = [None] * (steps_straight + 1)
+
+    # 循环不变量提到循环外：起点航向的 cos/sin 只算一次
+    cos_h0 = math.cos(START_H)
+    sin_h0 = math.sin(START_H)
+
     print(f"1. 生成直行段: 长度 {best_straight_len:.2f}m")
     for i in range(steps_straight + 1):
         dist = i * DT * speed_mps
-        px = START_X + dist * math.cos(START_H)
-        py = START_Y + dist * math.sin(START_H)
-        points.append({'t': current_t, 'x': px, 'y': py, 'h': START_H})
+        px = START_X + dist * cos_h0
+        py = START_Y + dist * sin_h0
+        points[i] = {'t': current_t, 'x': px, 'y': py, 'h': START_H}
         current_t += DT
         p_end_straight = (px, py, START_H)
-        
+
     # --- 第3步：生成右转入环段 (Transition Curve) ---
     entry_x, entry_y, entry_h = get_circle_pt(entry_angle_rad)
-    
+
     p0 = (p_end_straight[0], p_end_straight[1])
     p3 = (entry_x, entry_y)
-    
-    dist_connect = math.sqrt((p3[0]-p0[0])**2 + (p3[1]-p0[1])**2)
+
+    dist_connect = math.hypot(p3[0]-p0[0], p3[1]-p0[1])
     # 增加控制柄长度系数，使弯道更平缓
-    ctrl_len = dist_connect * 0.5 
-    
-    p1 = (p0[0] + ctrl_len * math.cos(p_end_straight[2]),
-          p0[1] + ctrl_len * math.sin(p_end_straight[2]))
+    ctrl_len = dist_connect * 0.5
+
+    # p_end_straight[2] 就是 START_H，复用上面算好的 cos/sin
+    p1 = (p0[0] + ctrl_len * cos_h0,
+          p0[1] + ctrl_len * sin_h0)
     p2 = (p3[0] - ctrl_len * math.cos(entry_h),
           p3[1] - ctrl_len * math.sin(entry_h))
     
-    curve_steps = 25 # 增加采样点保证平滑
     print(f"2. 生成右转入环段: 目标切入点 ({entry_x:.2f}, {entry_y:.2f})")
-    
-    for i in range(1, curve_steps + 1):
-        t_val = i / curve_steps
-        mt = 1 - t_val
-        
-        bx = mt**3*p0[0] + 3*mt**2*t_val*p1[0] + 3*mt*t_val**2*p2[0] + t_val**3*p3[0]
-        by = mt**3*p0[1] + 3*mt**2*t_val*p1[1] + 3*mt*t_val**2*p2[1] + t_val**3*p3[1]
-        
-        dx = 3*mt**2*(p1[0]-p0[0]) + 6*mt*t_val*(p2[0]-p1[0]) + 3*t_val**2*(p3[0]-p2[0])
-        dy = 3*mt**2*(p1[1]-p0[1]) + 6*mt*t_val*(p2[1]-p1[1]) + 3*t_val**2*(p3[1]-p2[1])
-        bh = math.atan2(dy, dx)
-        
-        prev_p = points[-1]
-        step_dist = math.sqrt((bx - prev_p['x'])**2 + (by - prev_p['y'])**2)
-        current_t += step_dist / speed_mps
-        
-        points.append({'t': current_t, 'x': bx, 'y': by, 'h': bh})
+
+    # 贝塞尔采样退化为两个小矩阵乘：预计算的 Bernstein 基 × 控制点矩阵
+    P = np.array([p0, p1, p2, p3])     # (4, 2)
+    xy = _B @ P
+    dxy = _BD @ np.diff(P, axis=0)     # 导数的控制点是相邻控制点之差
+    bx, by = xy[:, 0], xy[:, 1]
+    bh = np.arctan2(dxy[:, 1], dxy[:, 0])
+
+    # 按弧长 (相邻点距离) 推进时间，首段距离从直行段终点算起
+    step_dist = np.hypot(np.diff(bx, prepend=p0[0]), np.diff(by, prepend=p0[1]))
+    t_arr = current_t + np.cumsum(step_dist) / speed_mps
+
+    points.extend({'t': float(ti), 'x': float(xi), 'y': float(yi), 'h': float(hi)}
+                  for ti, xi, yi, hi in zip(t_arr, bx, by, bh))
+    current_t = float(t_arr[-1])
 
     # --- 第4步：生成环行段 (Circle) ---
     start_ang = entry_angle_rad
@@ -102,12 +114,18 @@ def generate_trajectory():
     
     print(f"3. 生成环行段: 到达底部，行驶弧长 {arc_len:.2f}m")
     
-    for i in range(1, circle_steps + 1):
-        frac = i / circle_steps
-        ang = start_ang + frac * (end_ang - start_ang)
-        cx, cy, ch = get_circle_pt(ang)
-        points.append({'t': current_t, 'x': cx, 'y': cy, 'h': ch})
-        current_t += DT
+    # 整段圆弧一次性向量化：一次 cos/sin 调用生成全部采样点
+    # (normalize_angle 的取模写法对 ndarray 同样成立)
+    frac = np.arange(1, circle_steps + 1) / circle_steps
+    ang = start_ang + frac * (end_ang - start_ang)
+    cx = CENTER_X + RADIUS * np.cos(ang)
+    cy = CENTER_Y + RADIUS * np.sin(ang)
+    ch = normalize_angle(ang + math.pi / 2)
+    t_arr = current_t + DT * np.arange(circle_steps)
+
+    points.extend({'t': float(ti), 'x': float(xi), 'y': float(yi), 'h': float(hi)}
+                  for ti, xi, yi, hi in zip(t_arr, cx, cy, ch))
+    current_t += circle_steps * DT
 
     return points
 
@@ -115,20 +133,22 @@ def generate_trajectory():
 
 vut_path = generate_trajectory()
 
-# 保存 VUT
+# 保存 VUT (整块文本拼好后一次写盘)
 with open(OUTPUT_VUT, 'w') as f:
-    for p in vut_path:
-        f.write(f'<Vertex time="{p["t"]:.4f}">\n')
-        f.write(f'    <Position><WorldPosition x="{p["x"]:.4f}" y="{p["y"]:.4f}" z="0" h="{p["h"]:.4f}"/></Position>\n')
-        f.write('</Vertex>\n')
+    f.write(''.join(
+        f'<Vertex time="{p["t"]:.4f}">\n'
+        f'    <Position><WorldPosition x="{p["x"]:.4f}" y="{p["y"]:.4f}" z="0" h="{p["h"]:.4f}"/></Position>\n'
+        '</Vertex>\n'
+        for p in vut_path))
 
 # 生成 Target (保持静止)
 with open(OUTPUT_TARGET, 'w') as f:
     target_x, target_y = -358.68, 81.02
-    for p in vut_path:
-        f.write(f'<Vertex time="{p["t"]:.4f}">\n')
-        f.write(f'    <Position><WorldPosition x="{target_x}" y="{target_y}" z="0" h="0.87"/></Position>\n')
-        f.write('</Vertex>\n')
+    f.write(''.join(
+        f'<Vertex time="{p["t"]:.4f}">\n'
+        f'    <Position><WorldPosition x="{target_x}" y="{target_y}" z="0" h="0.87"/></Position>\n'
+        '</Vertex>\n'
+        for p in vut_path))
 
 print(f"\n成功生成轨迹文件: {OUTPUT_VUT}")
 print(f"请记得修改 xosc Init 部分坐标为: x={START_X}, y={START_Y}, h={START_H}")
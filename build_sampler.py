@@ -0,0 +1,41 @@
+"""AOT 编译 track.py 的采样核，消除每次运行的 JIT 预热。
+
+用法: python build_sampler.py  →  生成 sampler.*.so (或 .pyd)
+track.py 启动时优先 import sampler，没有就回退到 @njit 版本。
+注意: pycc 不支持 parallel/prange，这里导出的是串行版本。
+"""
+import math
+from numba.pycc import CC
+
+cc = CC('sampler')
+
+
+@cc.export('sample_all', 'void(f8[:,:], i8[:], i8[:], f8, f8, f8[:], f8[:], f8[:], f8[:])')
+def sample_all(segs_arr, starts, counts, dt, speed_mps, out_t, out_x, out_y, out_h):
+    """与 track._sample_all 相同的逐段采样，串行 (AOT 限制)"""
+    for s in range(segs_arr.shape[0]):
+        x0 = segs_arr[s, 1]; y0 = segs_arr[s, 2]
+        h0 = segs_arr[s, 3]; k = segs_arr[s, 5]
+        base = starts[s]
+        t0 = base * dt
+        s0 = math.sin(h0); c0 = math.cos(h0)
+        if abs(k) < 1e-6:
+            for i in range(counts[s]):
+                ds = speed_mps * (i * dt)
+                out_t[base + i] = t0 + dt * i
+                out_x[base + i] = x0 + ds * c0
+                out_y[base + i] = y0 + ds * s0
+                out_h[base + i] = h0
+        else:
+            for i in range(counts[s]):
+                ds = speed_mps * (i * dt)
+                h = h0 + ds * k
+                out_t[base + i] = t0 + dt * i
+                out_x[base + i] = x0 + (math.sin(h) - s0) / k
+                out_y[base + i] = y0 + (c0 - math.cos(h)) / k
+                out_h[base + i] = h
+
+
+if __name__ == "__main__":
+    cc.compile()
+    print("已生成 sampler 模块")
@@ -1,6 +1,7 @@
 import numpy as np
 import json
 import math
+import xml.etree.ElementTree as ET
 import matplotlib.pyplot as plt
 
 class RoundaboutCollisionGenerator:
@@ -22,23 +23,24 @@ class RoundaboutCollisionGenerator:
         angle_travelled_rad = angular_velocity * self.ttc
         start_rad = math.radians(self.collision_angle_deg) - angle_travelled_rad
         
-        trajectory_points = []
+        # 全程向量化：角度/坐标/朝向一次性用 ufunc 算完，Python 只负责组装字典
         times = np.arange(0, self.sim_duration, self.sample_rate)
-        
-        for t in times:
-            current_rad = start_rad + angular_velocity * t
-            x = self.center[0] + self.radius * math.cos(current_rad)
-            y = self.center[1] + self.radius * math.sin(current_rad)
-            # 修正朝向：OpenSCENARIO里 0度通常朝东(x+)，90度朝北(y+)
-            heading_rad = current_rad + (math.pi / 2)
-            
-            point = {
-                "time": round(float(t), 3),
-                "x": round(x, 4),
-                "y": round(y, 4),
-                "h": round(heading_rad, 4)
-            }
-            trajectory_points.append(point)
+        current_rad = start_rad + angular_velocity * times
+        x = self.center[0] + self.radius * np.cos(current_rad)
+        y = self.center[1] + self.radius * np.sin(current_rad)
+        # 修正朝向：OpenSCENARIO里 0度通常朝东(x+)，90度朝北(y+)
+        heading_rad = current_rad + (math.pi / 2)
+
+        # 取整也成批做：np.round 一次处理整列，省掉每点 4 次 round() 调用
+        times_r = np.round(times, 3)
+        x_r = np.round(x, 4)
+        y_r = np.round(y, 4)
+        h_r = np.round(heading_rad, 4)
+
+        trajectory_points = [
+            {"time": float(t), "x": float(xi), "y": float(yi), "h": float(hi)}
+            for t, xi, yi, hi in zip(times_r, x_r, y_r, h_r)
+        ]
         return trajectory_points
 
     def generate_full_xosc(self, data, filename="MyRoundabout.xosc"):
@@ -48,129 +50,89 @@ class RoundaboutCollisionGenerator:
         ego_y = self.center[1] + self.radius * math.sin(coll_rad)
         ego_h = coll_rad + math.pi 
 
-        # 1. 生成轨迹XML
+        # 用 ElementTree 构树，交给 C 序列化器一次性输出：
+        # 逐点 SubElement 是 O(N)，属性值自动转义，不再手拼字符串模板
         # 【修改点A】：删除了 z="0.0"，让车自动贴地
-        vertex_str = ""
-        for p in data:
-            vertex_str += f"""
-            <Vertex time="{p['time']}">
-                <Position>
-                    <WorldPosition x="{p['x']}" y="{p['y']}" h="{p['h']}"/>
-                </Position>
-            </Vertex>"""
-
-        # 2. 生成XOSC内容
         # 【修改点B】：revMinor="1" (升级到 OpenSCENARIO 1.1 以支持 Vertex time)
         # 【修改点C】：Init阶段增加了SpeedAction，防止车辆休眠
-        xosc_content = f"""<?xml version="1.0" encoding="UTF-8"?>
-<OpenSCENARIO>
-    <FileHeader revMajor="1" revMinor="1" date="2024-01-20T12:00:00" description="Roundabout" author="PyGen"/>
-    <ParameterDeclarations/>
-    <CatalogLocations>
-        <VehicleCatalog>
-            <Directory path="Catalogs/Vehicles"/>
-        </VehicleCatalog>
-    </CatalogLocations>
-    <RoadNetwork>
-        <LogicFile filepath=""/>
-    </RoadNetwork>
-    
-    <Entities>
-        <ScenarioObject name="TargetCar">
-            <CatalogReference catalogName="VehicleCatalog" entryName="car_red"/>
-        </ScenarioObject>
-        <ScenarioObject name="Ego">
-            <CatalogReference catalogName="VehicleCatalog" entryName="car_white"/>
-        </ScenarioObject>
-    </Entities>
+        root = ET.Element('OpenSCENARIO')
+        ET.SubElement(root, 'FileHeader', revMajor="1", revMinor="1",
+                      date="2024-01-20T12:00:00", description="Roundabout", author="PyGen")
+        ET.SubElement(root, 'ParameterDeclarations')
+        catalogs = ET.SubElement(root, 'CatalogLocations')
+        ET.SubElement(ET.SubElement(catalogs, 'VehicleCatalog'), 'Directory',
+                      path="Catalogs/Vehicles")
+        ET.SubElement(ET.SubElement(root, 'RoadNetwork'), 'LogicFile', filepath="")
+
+        entities = ET.SubElement(root, 'Entities')
+        for obj_name, entry in (("TargetCar", "car_red"), ("Ego", "car_white")):
+            obj = ET.SubElement(entities, 'ScenarioObject', name=obj_name)
+            ET.SubElement(obj, 'CatalogReference',
+                          catalogName="VehicleCatalog", entryName=entry)
+
+        storyboard = ET.SubElement(root, 'Storyboard')
+        init_actions = ET.SubElement(ET.SubElement(storyboard, 'Init'), 'Actions')
+
+        # TargetCar: 传送到轨迹起点 + SpeedAction 防休眠
+        target_private = ET.SubElement(init_actions, 'Private', entityRef="TargetCar")
+        teleport = ET.SubElement(ET.SubElement(target_private, 'PrivateAction'),
+                                 'TeleportAction')
+        ET.SubElement(ET.SubElement(teleport, 'Position'), 'WorldPosition',
+                      x=str(data[0]['x']), y=str(data[0]['y']), h=str(data[0]['h']))
+        speed_action = ET.SubElement(
+            ET.SubElement(ET.SubElement(target_private, 'PrivateAction'),
+                          'LongitudinalAction'),
+            'SpeedAction')
+        ET.SubElement(speed_action, 'SpeedActionDynamics',
+                      dynamicsShape="step", value="0.0", dynamicsDimension="time")
+        ET.SubElement(ET.SubElement(speed_action, 'SpeedActionTarget'),
+                      'AbsoluteTargetSpeed', value=str(self.v_target_kmh / 3.6))
+
+        # Ego: 传送到碰撞点
+        ego_private = ET.SubElement(init_actions, 'Private', entityRef="Ego")
+        teleport = ET.SubElement(ET.SubElement(ego_private, 'PrivateAction'),
+                                 'TeleportAction')
+        ET.SubElement(ET.SubElement(teleport, 'Position'), 'WorldPosition',
+                      x=str(ego_x), y=str(ego_y), h=str(ego_h))
+
+        story = ET.SubElement(storyboard, 'Story', name="MainStory")
+        act = ET.SubElement(story, 'Act', name="MoveAct")
+        group = ET.SubElement(act, 'ManeuverGroup',
+                              maximumExecutionCount="1", name="MoveSeq")
+        actors = ET.SubElement(group, 'Actors', selectTriggeringEntities="false")
+        ET.SubElement(actors, 'EntityRef', entityRef="TargetCar")
+        maneuver = ET.SubElement(group, 'Maneuver', name="MoveManeuver")
+        event = ET.SubElement(maneuver, 'Event', name="MoveEvent", priority="overwrite")
+        action = ET.SubElement(event, 'Action', name="MoveAction")
+        follow = ET.SubElement(
+            ET.SubElement(ET.SubElement(action, 'PrivateAction'), 'RoutingAction'),
+            'FollowTrajectoryAction')
+        trajectory = ET.SubElement(follow, 'Trajectory',
+                                   name="RoundaboutTraj", closed="false")
+        polyline = ET.SubElement(ET.SubElement(trajectory, 'Shape'), 'Polyline')
+        for p in data:
+            vertex = ET.SubElement(polyline, 'Vertex', time=str(p['time']))
+            ET.SubElement(ET.SubElement(vertex, 'Position'), 'WorldPosition',
+                          x=str(p['x']), y=str(p['y']), h=str(p['h']))
+        ET.SubElement(ET.SubElement(follow, 'TimeReference'), 'Timing',
+                      domainAbsoluteRelative="absolute", scale="1.0", offset="0.0")
+        ET.SubElement(follow, 'TrajectoryFollowingMode', followingMode="position")
+
+        def add_sim_time_trigger(parent, cond_name):
+            cond_group = ET.SubElement(ET.SubElement(parent, 'StartTrigger'),
+                                       'ConditionGroup')
+            cond = ET.SubElement(cond_group, 'Condition',
+                                 name=cond_name, delay="0", conditionEdge="rising")
+            ET.SubElement(ET.SubElement(cond, 'ByValueCondition'),
+                          'SimulationTimeCondition', value="0", rule="greaterThan")
+
+        add_sim_time_trigger(event, "Start")
+        add_sim_time_trigger(act, "ActStart")
+        ET.SubElement(storyboard, 'StopTrigger')
 
-    <Storyboard>
-        <Init>
-            <Actions>
-                <Private entityRef="TargetCar">
-                    <PrivateAction>
-                        <TeleportAction>
-                            <Position>
-                                <WorldPosition x="{data[0]['x']}" y="{data[0]['y']}" h="{data[0]['h']}"/>
-                            </Position>
-                        </TeleportAction>
-                    </PrivateAction>
-                    <PrivateAction>
-                        <LongitudinalAction>
-                            <SpeedAction>
-                                <SpeedActionDynamics dynamicsShape="step" value="0.0" dynamicsDimension="time"/>
-                                <SpeedActionTarget>
-                                    <AbsoluteTargetSpeed value="{self.v_target_kmh / 3.6}"/>
-                                </SpeedActionTarget>
-                            </SpeedAction>
-                        </LongitudinalAction>
-                    </PrivateAction>
-                </Private>
-                <Private entityRef="Ego">
-                    <PrivateAction>
-                        <TeleportAction>
-                            <Position>
-                                <WorldPosition x="{ego_x}" y="{ego_y}" h="{ego_h}"/>
-                            </Position>
-                        </TeleportAction>
-                    </PrivateAction>
-                </Private>
-            </Actions>
-        </Init>
-        <Story name="MainStory">
-            <Act name="MoveAct">
-                <ManeuverGroup maximumExecutionCount="1" name="MoveSeq">
-                    <Actors selectTriggeringEntities="false">
-                        <EntityRef entityRef="TargetCar"/>
-                    </Actors>
-                    <Maneuver name="MoveManeuver">
-                        <Event name="MoveEvent" priority="overwrite">
-                            <Action name="MoveAction">
-                                <PrivateAction>
-                                    <RoutingAction>
-                                        <FollowTrajectoryAction>
-                                            <Trajectory name="RoundaboutTraj" closed="false">
-                                                <Shape>
-                                                    <Polyline>{vertex_str}</Polyline>
-                                                </Shape>
-                                            </Trajectory>
-                                            <TimeReference>
-                                                <Timing domainAbsoluteRelative="absolute" scale="1.0" offset="0.0"/>
-                                            </TimeReference>
-                                            <TrajectoryFollowingMode followingMode="position"/>
-                                        </FollowTrajectoryAction>
-                                    </RoutingAction>
-                                </PrivateAction>
-                            </Action>
-                            <StartTrigger>
-                                <ConditionGroup>
-                                    <Condition name="Start" delay="0" conditionEdge="rising">
-                                        <ByValueCondition>
-                                            <SimulationTimeCondition value="0" rule="greaterThan"/>
-                                        </ByValueCondition>
-                                    </Condition>
-                                </ConditionGroup>
-                            </StartTrigger>
-                        </Event>
-                    </Maneuver>
-                </ManeuverGroup>
-                <StartTrigger>
-                    <ConditionGroup>
-                        <Condition name="ActStart" delay="0" conditionEdge="rising">
-                            <ByValueCondition>
-                                <SimulationTimeCondition value="0" rule="greaterThan"/>
-                            </ByValueCondition>
-                        </Condition>
-                    </ConditionGroup>
-                </StartTrigger>
-            </Act>
-        </Story>
-        <StopTrigger/>
-    </Storyboard>
-</OpenSCENARIO>
-"""
-        with open(filename, 'w', encoding='utf-8') as f:
-            f.write(xosc_content)
+        tree = ET.ElementTree(root)
+        ET.indent(tree, space="    ")
+        tree.write(filename, xml_declaration=True, encoding='utf-8')
         print(f"✅ 终极修复版文件已生成: {filename}")
 
 if __name__ == "__main__":
@@ -1,5 +1,7 @@
 import math
+import numpy as np
 import matplotlib.pyplot as plt
+from numba import njit
 
 # ================= 1. 参数配置区 =================
 
@@ -38,26 +40,37 @@ RADIUS = 13.0
 
 class QuinticPolynomial:
     def __init__(self, xs, vxs, axs, xe, vxe, axe, time):
+        # 起始时刻固定为 0，终点约束方程组有封闭解，
+        # 直接套公式求 a3..a5，不必再展开 3×3 Cramer 行列式
         self.a0 = xs; self.a1 = vxs; self.a2 = axs / 2.0
-        t = time; t2 = t*t; t3 = t2*t; t4 = t3*t; t5 = t4*t
-        A11, A12, A13 = t3, t4, t5
-        A21, A22, A23 = 3*t2, 4*t3, 5*t4
-        A31, A32, A33 = 6*t, 12*t2, 20*t3
-        b1 = xe - self.a0 - self.a1*t - self.a2*t2
-        b2 = vxe - self.a1 - 2*self.a2*t
-        b3 = axe - 2*self.a2
-        det_A = A11*(A22*A33 - A23*A32) - A12*(A21*A33 - A23*A31) + A13*(A21*A32 - A22*A31)
-        det_X = b1*(A22*A33 - A23*A32) - A12*(b2*A33 - A23*b3) + A13*(b2*A32 - A22*b3)
-        det_Y = A11*(b2*A33 - A23*b3) - b1*(A21*A33 - A23*A31) + A13*(A21*b3 - b2*A31)
-        det_Z = A11*(A22*b3 - b2*A32) - A12*(A21*b3 - b2*A31) + b1*(A21*A32 - A22*A31)
-        self.a3 = det_X / det_A; self.a4 = det_Y / det_A; self.a5 = det_Z / det_A
+        T = time; T2 = T*T; T3 = T2*T
+        dp = xe - self.a0 - self.a1*T - self.a2*T2
+        dv = vxe - self.a1 - 2*self.a2*T
+        da = axe - 2*self.a2
+        self.a3 = (20*dp - 8*dv*T + da*T2) / (2*T3)
+        self.a4 = (-30*dp + 14*dv*T - 2*da*T2) / (2*T2*T2)
+        self.a5 = (12*dp - 6*dv*T + da*T2) / (2*T3*T2)
 
     def calc_point(self, t):
-        return self.a0 + self.a1*t + self.a2*t**2 + self.a3*t**3 + self.a4*t**4 + self.a5*t**5
+        return quintic_point(self.a0, self.a1, self.a2, self.a3, self.a4, self.a5, t)
     def calc_first_derivative(self, t):
-        return self.a1 + 2*self.a2*t + 3*self.a3*t**2 + 4*self.a4*t**3 + 5*self.a5*t**4
+        return quintic_first_derivative(self.a1, self.a2, self.a3, self.a4, self.a5, t)
     def calc_second_derivative(self, t):
-        return 2*self.a2 + 6*self.a3*t + 12*self.a4*t**2 + 20*self.a5*t**3
+        return quintic_second_derivative(self.a2, self.a3, self.a4, self.a5, t)
+
+# 求值器拆成自由函数交给 numba 编译：纯寄存器算术，也方便被其他 JIT 代码调用
+# (Horner 形式：去掉显式幂运算，只剩一串乘加)
+@njit(cache=True)
+def quintic_point(a0, a1, a2, a3, a4, a5, t):
+    return a0 + t*(a1 + t*(a2 + t*(a3 + t*(a4 + t*a5))))
+
+@njit(cache=True)
+def quintic_first_derivative(a1, a2, a3, a4, a5, t):
+    return a1 + t*(2*a2 + t*(3*a3 + t*(4*a4 + t*5*a5)))
+
+@njit(cache=True)
+def quintic_second_derivative(a2, a3, a4, a5, t):
+    return 2*a2 + t*(6*a3 + t*(12*a4 + t*20*a5))
 
 def normalize_angle(a):
     return (a + math.pi) % (2 * math.pi) - math.pi
@@ -68,27 +81,26 @@ def get_circle_state(angle):
     h = normalize_angle(angle + math.pi / 2.0)
     return x, y, h
 
+@njit(cache=True)
 def calc_unwinding_clothoid(start_x, start_y, start_h, start_k, length, step_size):
-    points = []
+    """曲率是 s 的仿射函数，航向积分有解析式 h(s) = h0 + k0*(s - s²/2L)，
+    不用逐步欧拉积分；位置按中点航向一次 cumsum 推出。返回 (x, y, h) 数组"""
     steps = int(length / step_size)
-    curr_x, curr_y, curr_h = start_x, start_y, start_h
-    for i in range(steps + 1):
-        s = i * step_size
-        k = start_k * (1.0 - s / length)
-        points.append({'s': s, 'x': curr_x, 'y': curr_y, 'h': curr_h})
-        if i < steps:
-            s_mid = s + step_size / 2.0
-            k_mid = start_k * (1.0 - s_mid / length)
-            d_h = k_mid * step_size
-            curr_x += step_size * math.cos(curr_h + d_h/2.0)
-            curr_y += step_size * math.sin(curr_h + d_h/2.0)
-            curr_h += d_h
-    return points
+    s = np.arange(steps + 1) * step_size
+    h = start_h + start_k * (s - s*s / (2.0 * length))
+    # 每步推进沿用原来的中点格式：顶点航向 + 中点曲率的半步转角
+    s_mid = s[:-1] + step_size / 2.0
+    k_mid = start_k * (1.0 - s_mid / length)
+    h_step = h[:-1] + k_mid * step_size / 2.0
+    x = np.empty(steps + 1); y = np.empty(steps + 1)
+    x[0] = start_x; y[0] = start_y
+    x[1:] = start_x + np.cumsum(step_size * np.cos(h_step))
+    y[1:] = start_y + np.cumsum(step_size * np.sin(h_step))
+    return x, y, h
 
 # ================= 3. 轨迹规划主程序 =================
 
 def plan_trajectory():
-    points = []
     current_time = 0.0
     
     # --- Step 0: 计算目标方向 ---
@@ -98,37 +110,80 @@ def plan_trajectory():
     print(f"1. 目标直道方向: {EXIT_TARGET_H:.4f} rad")
     
     # --- Step 1: 入环规划 (保持不变) ---
+    # (角度, T) 搜索网格整体用 NumPy 广播求解：封闭解公式本身就是 ufunc 运算，
+    # 一次算出全网格的 a3..a5，代价函数和路径长度门限也按数组处理，最后 argmin 取优
     print("2. 计算入环路径...")
     sx, sy, sh = START_X, START_Y, START_H
     svx = SPEED_MS * math.cos(sh); svy = SPEED_MS * math.sin(sh)
-    best_cost = float('inf'); best_poly_x = None; best_poly_y = None; best_T = 0; best_entry_angle = 0
-    search_angles = [i * 0.1 for i in range(0, 30)] 
-    search_times = [i * 0.5 for i in range(5, 12)]
-    
-    for ang in search_angles:
-        ex, ey, eh = get_circle_state(ang)
-        evx, evy = SPEED_MS * math.cos(eh), SPEED_MS * math.sin(eh)
-        eax, eay = (SPEED_MS**2/RADIUS)*math.cos(ang+math.pi), (SPEED_MS**2/RADIUS)*math.sin(ang+math.pi)
-        for T in search_times:
-            px = QuinticPolynomial(sx, svx, 0, ex, evx, eax, T)
-            py = QuinticPolynomial(sy, svy, 0, ey, evy, eay, T)
-            mid_x = px.calc_point(T/2); mid_y = py.calc_point(T/2)
-            dist_path = math.sqrt((sx-mid_x)**2 + (sy-mid_y)**2) + math.sqrt((mid_x-ex)**2 + (mid_y-ey)**2)
-            dist_direct = math.sqrt((sx-ex)**2 + (sy-ey)**2)
-            if dist_path < dist_direct * 1.6:
-                cost = 0
-                for k in range(5):
-                    t_samp = T*(k/5)
-                    cost += px.calc_second_derivative(t_samp)**2 + py.calc_second_derivative(t_samp)**2
-                if cost < best_cost:
-                    best_cost = cost; best_poly_x = px; best_poly_y = py; best_T = T; best_entry_angle = ang
-    
+    search_angles = np.arange(0, 30) * 0.1
+    search_times = np.arange(5, 12) * 0.5
+
+    # 终点状态按切入角批量计算，列向量形状 (30,1) 以便与 T (7,) 广播
+    ang = search_angles[:, None]
+    ex = CENTER_X + RADIUS * np.cos(ang)
+    ey = CENTER_Y + RADIUS * np.sin(ang)
+    eh = normalize_angle(ang + math.pi / 2.0)
+    evx = SPEED_MS * np.cos(eh); evy = SPEED_MS * np.sin(eh)
+    eax = (SPEED_MS**2/RADIUS) * np.cos(ang + math.pi)
+    eay = (SPEED_MS**2/RADIUS) * np.sin(ang + math.pi)
+    T = search_times
+    T2 = T*T; T3 = T2*T
+
+    def grid_coeffs(a0, a1, xe, vxe, axe):
+        """t0=0 封闭解的网格版：返回 (a3, a4, a5)，形状 (角度, T)"""
+        dp = xe - a0 - a1*T
+        dv = vxe - a1
+        da = axe
+        a3 = (20*dp - 8*dv*T + da*T2) / (2*T3)
+        a4 = (-30*dp + 14*dv*T - 2*da*T2) / (2*T2*T2)
+        a5 = (12*dp - 6*dv*T + da*T2) / (2*T3*T2)
+        return a3, a4, a5
+
+    x3, x4, x5 = grid_coeffs(sx, svx, ex, evx, eax)
+    y3, y4, y5 = grid_coeffs(sy, svy, ey, evy, eay)
+
+    # 中点位置作路径长度门限 (与原逐点逻辑相同的 1.6 倍系数)
+    th = T / 2
+    mid_x = sx + svx*th + x3*th**3 + x4*th**4 + x5*th**5
+    mid_y = sy + svy*th + y3*th**3 + y4*th**4 + y5*th**5
+    dist_path = np.hypot(sx-mid_x, sy-mid_y) + np.hypot(mid_x-ex, mid_y-ey)
+    dist_direct = np.hypot(sx-ex, sy-ey)
+
+    # 5 个采样分数处的二阶导平方和作为平滑度代价，tau 形状 (30,7,5)
+    tau = T[:, None] * np.array([0.0, 0.2, 0.4, 0.6, 0.8])
+    d2x = 6*x3[..., None]*tau + 12*x4[..., None]*tau**2 + 20*x5[..., None]*tau**3
+    d2y = 6*y3[..., None]*tau + 12*y4[..., None]*tau**2 + 20*y5[..., None]*tau**3
+    cost = np.sum(d2x**2 + d2y**2, axis=-1)
+
+    cost = np.where(dist_path < dist_direct * 1.6, cost, np.inf)
+    ai, ti = np.unravel_index(np.argmin(cost), cost.shape)
+    best_entry_angle = float(search_angles[ai])
+    best_T = float(search_times[ti])
+
+    # 只为胜出的网格点重建一对标量多项式，供后面逐步采样
+    bex, bey, beh = get_circle_state(best_entry_angle)
+    bevx, bevy = SPEED_MS * math.cos(beh), SPEED_MS * math.sin(beh)
+    beax = (SPEED_MS**2/RADIUS) * math.cos(best_entry_angle + math.pi)
+    beay = (SPEED_MS**2/RADIUS) * math.sin(best_entry_angle + math.pi)
+    best_poly_x = QuinticPolynomial(sx, svx, 0, bex, bevx, beax, best_T)
+    best_poly_y = QuinticPolynomial(sy, svy, 0, bey, bevy, beay, best_T)
+
+    # 每个阶段的点数都能事先算出：按段预分配 SoA 数组，不再逐点攒字典，
+    # 各阶段把自己的采样写进对应数组，最后一次 concatenate 拼成完整轨迹
     steps = int(best_T / DT)
-    for i in range(steps + 1):
+    n_ent = steps + 1
+    t_ent = np.empty(n_ent); x_ent = np.empty(n_ent); y_ent = np.empty(n_ent); h_ent = np.empty(n_ent)
+    # 系数在循环外解包一次，循环内直接调 JIT 求值器，免去每步 12 次属性查找
+    xa0, xa1, xa2, xa3, xa4, xa5 = best_poly_x.a0, best_poly_x.a1, best_poly_x.a2, best_poly_x.a3, best_poly_x.a4, best_poly_x.a5
+    ya0, ya1, ya2, ya3, ya4, ya5 = best_poly_y.a0, best_poly_y.a1, best_poly_y.a2, best_poly_y.a3, best_poly_y.a4, best_poly_y.a5
+    for i in range(n_ent):
         t = i * DT
-        x = best_poly_x.calc_point(t); y = best_poly_y.calc_point(t)
-        vx = best_poly_x.calc_first_derivative(t); vy = best_poly_y.calc_first_derivative(t)
-        points.append({'t': current_time + t, 'x': x, 'y': y, 'h': math.atan2(vy, vx)})
+        x_ent[i] = quintic_point(xa0, xa1, xa2, xa3, xa4, xa5, t)
+        y_ent[i] = quintic_point(ya0, ya1, ya2, ya3, ya4, ya5, t)
+        vx = quintic_first_derivative(xa1, xa2, xa3, xa4, xa5, t)
+        vy = quintic_first_derivative(ya1, ya2, ya3, ya4, ya5, t)
+        t_ent[i] = current_time + t
+        h_ent[i] = math.atan2(vy, vx)
     current_time += steps * DT
     
     # --- Step 2: 确定出环角度 (加入用户控制) ---
@@ -153,43 +208,45 @@ def plan_trajectory():
     arc_len = (final_exit_circle_angle - best_entry_angle) * RADIUS
     circle_steps = int(arc_len / (SPEED_MS * DT))
     omega = SPEED_MS / RADIUS
-    for i in range(1, circle_steps + 1):
-        t_add = i * DT
-        ang = best_entry_angle + omega * t_add
-        x, y, h = get_circle_state(ang)
-        points.append({'t': current_time + t_add, 'x': x, 'y': y, 'h': h})
+    # 圆周段整段向量化：一次 cos/sin 调用生成全部采样点
+    # (normalize_angle 的取模写法对 ndarray 同样成立)
+    t_add = np.arange(1, circle_steps + 1) * DT
+    ang = best_entry_angle + omega * t_add
+    x_arc = CENTER_X + RADIUS * np.cos(ang)
+    y_arc = CENTER_Y + RADIUS * np.sin(ang)
+    h_arc = normalize_angle(ang + math.pi / 2.0)
+    t_arc = current_time + t_add
     current_time += circle_steps * DT
-    
+
     # --- Step 3: 回旋线解旋 ---
     print(f"4. 生成 {SPIRAL_LENGTH}m 回旋线...")
-    last_p = points[-1]
-    clothoid_points = calc_unwinding_clothoid(
-        last_p['x'], last_p['y'], last_p['h'], 
+    clo_x, clo_y, clo_h = calc_unwinding_clothoid(
+        x_arc[-1], y_arc[-1], h_arc[-1],
         k_circle, SPIRAL_LENGTH, SPEED_MS * DT
     )
-    for cp in clothoid_points[1:]:
-        current_time += DT
-        points.append({'t': current_time, 'x': cp['x'], 'y': cp['y'], 'h': cp['h']})
-        
+    # 首点与圆周段末点重合，跳过
+    x_spi = clo_x[1:]; y_spi = clo_y[1:]; h_spi = clo_h[1:]
+    n_spi = x_spi.size
+    t_spi = current_time + DT * np.arange(1, n_spi + 1)
+    current_time += n_spi * DT
+
     # --- Step 4: 最终横向+航向修正 (Snapping) ---
     # 因为强制增加绕行角度，回旋线结束时车头肯定不对准直道了
     # 我们用五次多项式把车头和车身都拉回直道
-    last_p = points[-1]
-    
     dist_vec = math.sqrt(dx*dx + dy*dy)
     ux, uy = dx/dist_vec, dy/dist_vec
-    
+
     # 投影修正逻辑
-    v_x = last_p['x'] - EXIT_P1_X; v_y = last_p['y'] - EXIT_P1_Y
+    v_x = x_spi[-1] - EXIT_P1_X; v_y = y_spi[-1] - EXIT_P1_Y
     proj_len = v_x * ux + v_y * uy
     # 在目标线上选一个足够远的点作为“对齐点”
     snap_dist = 40.0 # 距离给大一点，保证修正过程平滑
     final_x = EXIT_P1_X + (proj_len + snap_dist) * ux
     final_y = EXIT_P1_Y + (proj_len + snap_dist) * uy
-    
+
     # 起点：回旋线末端
-    sx, sy = last_p['x'], last_p['y']
-    svx, svy = SPEED_MS * math.cos(last_p['h']), SPEED_MS * math.sin(last_p['h'])
+    sx, sy = x_spi[-1], y_spi[-1]
+    svx, svy = SPEED_MS * math.cos(h_spi[-1]), SPEED_MS * math.sin(h_spi[-1])
     
     # 终点：完全对齐直道
     ex, ey = final_x, final_y
@@ -200,39 +257,52 @@ def plan_trajectory():
     
     print("5. 执行最终修正...")
     snap_steps = int(snap_dist / (SPEED_MS * DT))
+    t_snap = np.empty(snap_steps); x_snap = np.empty(snap_steps)
+    y_snap = np.empty(snap_steps); h_snap = np.empty(snap_steps)
+    # 同入环段：系数只解包一次
+    xa0, xa1, xa2, xa3, xa4, xa5 = snap_poly_x.a0, snap_poly_x.a1, snap_poly_x.a2, snap_poly_x.a3, snap_poly_x.a4, snap_poly_x.a5
+    ya0, ya1, ya2, ya3, ya4, ya5 = snap_poly_y.a0, snap_poly_y.a1, snap_poly_y.a2, snap_poly_y.a3, snap_poly_y.a4, snap_poly_y.a5
     for i in range(1, snap_steps + 1):
         t = i * DT
         current_time += DT
-        x = snap_poly_x.calc_point(t)
-        y = snap_poly_y.calc_point(t)
-        vx = snap_poly_x.calc_first_derivative(t)
-        vy = snap_poly_y.calc_first_derivative(t)
-        points.append({'t': current_time, 'x': x, 'y': y, 'h': math.atan2(vy, vx)})
-        
-    # Step 5: 补充纯直线
-    for i in range(1, 20):
-        t = current_time + i*DT
-        points.append({'t': t, 'x': ex + i*DT*evx, 'y': ey + i*DT*evy, 'h': EXIT_TARGET_H})
+        x_snap[i-1] = quintic_point(xa0, xa1, xa2, xa3, xa4, xa5, t)
+        y_snap[i-1] = quintic_point(ya0, ya1, ya2, ya3, ya4, ya5, t)
+        vx = quintic_first_derivative(xa1, xa2, xa3, xa4, xa5, t)
+        vy = quintic_first_derivative(ya1, ya2, ya3, ya4, ya5, t)
+        t_snap[i-1] = current_time
+        h_snap[i-1] = math.atan2(vy, vx)
+
+    # Step 5: 补充纯直线 (等差数列直接广播)
+    i_tail = np.arange(1, 20)
+    t_tail = current_time + i_tail*DT
+    x_tail = ex + i_tail*DT*evx
+    y_tail = ey + i_tail*DT*evy
+    h_tail = np.full(19, EXIT_TARGET_H)
 
-    return points
+    ts = np.concatenate((t_ent, t_arc, t_spi, t_snap, t_tail))
+    xs = np.concatenate((x_ent, x_arc, x_spi, x_snap, x_tail))
+    ys = np.concatenate((y_ent, y_arc, y_spi, y_snap, y_tail))
+    hs = np.concatenate((h_ent, h_arc, h_spi, h_snap, h_tail))
+    return ts, xs, ys, hs
 
 # ================= 4. 输出 =================
 
-vt1_path = plan_trajectory()
+vt1_t, vt1_x, vt1_y, vt1_h = plan_trajectory()
 
+# 整块文本拼好后一次写盘，省掉每个 Vertex 三次小 write
 with open(OUTPUT_FILE, 'w') as f:
-    for p in vt1_path:
-        f.write(f'<Vertex time="{p["t"]:.4f}">\n')
-        f.write(f'    <Position><WorldPosition x="{p["x"]:.4f}" y="{p["y"]:.4f}" z="0" h="{p["h"]:.4f}"/></Position>\n')
-        f.write('</Vertex>\n')
+    f.write(''.join(
+        f'<Vertex time="{t:.4f}">\n'
+        f'    <Position><WorldPosition x="{x:.4f}" y="{y:.4f}" z="0" h="{h:.4f}"/></Position>\n'
+        '</Vertex>\n'
+        for t, x, y, h in zip(vt1_t, vt1_x, vt1_y, vt1_h)))
 
 print(f"\n[Success] 轨迹已生成，额外绕行: {EXTRA_ROTATION_DEG}度")
 
 # 绘图
 try:
-    px = [p['x'] for p in vt1_path]; py = [p['y'] for p in vt1_path]
     plt.figure(figsize=(8,8))
-    plt.plot(px, py, 'b.-', label='Path')
+    plt.plot(vt1_x, vt1_y, 'b.-', label='Path')
     circle = plt.Circle((CENTER_X, CENTER_Y), RADIUS, color='gray', fill=False, linestyle='--')
     plt.gca().add_patch(circle)
     plt.plot(START_X, START_Y, 'go', label='Start')
@@ -1,6 +1,11 @@
 import math
 import matplotlib.pyplot as plt
 import numpy as np
+from collections import namedtuple
+from functools import lru_cache
+
+# 整条轨迹的 SoA 存储：四个平行数组，代替逐点字典
+Trajectory = namedtuple('Trajectory', ['t', 'x', 'y', 'h'])
 
 # ================= 配置 =================
 OUTPUT_VUT = "trajectory_vut.txt"
@@ -35,6 +40,8 @@ def calc_coords(x0, y0, h0, s, k):
         y = y0 + (math.cos(h0) - math.cos(h)) / k
     return x, y, h
 
+# roads_db 不会变，端点状态按 (rid, reverse) 记忆化，间隙填补时反复查询不再重算
+@lru_cache(maxsize=None)
 def get_road_end_state(rid, reverse=False):
     """获取某条路终点的状态 (x, y, h)"""
     geoms = roads_db[rid]
@@ -52,6 +59,7 @@ def get_road_end_state(rid, reverse=False):
         # 逆向行驶结束时的 Heading 要反转 180度
         return first_g[1], first_g[2], first_g[3] + math.pi
 
+@lru_cache(maxsize=None)
 def get_road_start_state(rid, reverse=False):
     """获取某条路起点的状态 (x, y, h)"""
     geoms = roads_db[rid]
@@ -59,25 +67,26 @@ def get_road_start_state(rid, reverse=False):
         g0 = geoms[0]
         return g0[1], g0[2], g0[3]
     else:
-        # 逆向的起点是顺向的终点
-        return get_road_end_state(rid, reverse=False)[0], get_road_end_state(rid, reverse=False)[1], get_road_end_state(rid, reverse=False)[2] + math.pi
+        # 逆向的起点是顺向的终点 (顺便修掉原来连查三次的写法)
+        lx, ly, lh = get_road_end_state(rid, reverse=False)
+        return lx, ly, lh + math.pi
 
 # ================= 平滑插值 (Bezier) =================
 def bezier_interp(p0, p3, t):
-    """简单三次贝塞尔曲线插值"""
+    """简单三次贝塞尔曲线插值。t 传 ndarray 时整条曲线一次算完 (Bernstein 基是 ufunc 运算)"""
     # 自动推算控制点 p1, p2
     dist = math.sqrt((p3[0]-p0[0])**2 + (p3[1]-p0[1])**2) / 3.0
     p1 = (p0[0] + dist * math.cos(p0[2]), p0[1] + dist * math.sin(p0[2]))
     p2 = (p3[0] - dist * math.cos(p3[2]), p3[1] - dist * math.sin(p3[2]))
-    
+
     inv_t = 1 - t
     x = (inv_t**3)*p0[0] + 3*(inv_t**2)*t*p1[0] + 3*inv_t*(t**2)*p2[0] + (t**3)*p3[0]
     y = (inv_t**3)*p0[1] + 3*(inv_t**2)*t*p1[1] + 3*inv_t*(t**2)*p2[1] + (t**3)*p3[1]
-    
+
     # 简单估算 Heading (切线)
     dx = 3*(inv_t**2)*(p1[0]-p0[0]) + 6*inv_t*t*(p2[0]-p1[0]) + 3*(t**2)*(p3[0]-p2[0])
     dy = 3*(inv_t**2)*(p1[1]-p0[1]) + 6*inv_t*t*(p2[1]-p1[1]) + 3*(t**2)*(p3[1]-p2[1])
-    h = math.atan2(dy, dx)
+    h = np.arctan2(dy, dx)
     return x, y, h
 
 # ================= 主逻辑 =================
@@ -92,7 +101,8 @@ road_configs = [
     {'id': '101', 'rev': False}  # 顺向
 ]
 
-vut_points = []
+# 各段 (路段/间隙) 的数组先收集，最后一次 concatenate 成完整轨迹
+seg_t = []; seg_x = []; seg_y = []; seg_h = []
 speed_mps = VUT_SPEED_KMH / 3.6
 current_t = 0.0
 
@@ -110,36 +120,45 @@ for i in range(len(road_configs)):
     duration = total_len / speed_mps
     steps = int(duration / DT)
     
-    for s_step in range(steps):
-        dist_driven = s_step * DT * speed_mps
-        
-        # 计算局部 s
-        local_s = dist_driven if not is_rev else (total_len - dist_driven)
-        
-        # 找 geometry
-        acc_s = 0
-        gx, gy, gh = 0, 0, 0
-        
-        # 如果是逆向，我们需要仔细倒推 geometry
-        # 简单起见，我们不管 geometry 顺序，直接用总长度减去 local_s 定位
-        # 寻找 local_s 落在哪个 geometry
-        found_g = False
-        for g in geoms:
-            if local_s <= acc_s + g[4] + 0.001:
-                geo_s = local_s - acc_s
-                gx, gy, gh = calc_coords(g[1], g[2], g[3], geo_s, g[5])
-                found_g = True
-                break
-            acc_s += g[4]
-            
-        if not found_g: # 精度误差处理
-            last = geoms[-1]
-            gx, gy, gh = calc_coords(last[1], last[2], last[3], last[4], last[5])
-
-        if is_rev: gh += math.pi
-        
-        vut_points.append({'t': current_t, 'x': gx, 'y': gy, 'h': gh})
-        current_t += DT
+    # 整条路的采样一次算完：里程数组 → 按累计长度定位 geometry → 弧线公式批量求值
+    dist_driven = np.arange(steps) * DT * speed_mps
+    # 计算局部 s (逆向时用总长度减去里程定位)
+    local_s = dist_driven if not is_rev else (total_len - dist_driven)
+
+    g_arr = np.array(geoms)                 # 列: s_offset, x0, y0, h0, length, k
+    lens = g_arr[:, 4]
+    acc_s = np.concatenate(([0.0], np.cumsum(lens)[:-1]))
+    # 每个采样点落在首个满足容差的 geometry 上 (geometry 数很少，直接布尔矩阵)
+    cond = local_s[:, None] <= (acc_s + lens + 0.001)[None, :]
+    found_g = cond.any(axis=1)
+    idx = np.argmax(cond, axis=1)
+
+    x0 = g_arr[idx, 1]; y0 = g_arr[idx, 2]; h0 = g_arr[idx, 3]; k = g_arr[idx, 5]
+    geo_s = local_s - acc_s[idx]
+
+    # calc_coords 的向量形式：直线/圆弧两支用 np.where 选择
+    straight = np.abs(k) < 1e-9
+    k_safe = np.where(straight, 1.0, k)
+    h_end = h0 + geo_s * k
+    gx = np.where(straight, x0 + geo_s * np.cos(h0),
+                  x0 + (np.sin(h_end) - np.sin(h0)) / k_safe)
+    gy = np.where(straight, y0 + geo_s * np.sin(h0),
+                  y0 + (np.cos(h0) - np.cos(h_end)) / k_safe)
+    gh = np.where(straight, h0, h_end)
+
+    # 精度误差处理：没有命中任何 geometry 的点收到这条路的物理终点
+    if not found_g.all():
+        last = geoms[-1]
+        lx, ly, lh = calc_coords(last[1], last[2], last[3], last[4], last[5])
+        gx = np.where(found_g, gx, lx)
+        gy = np.where(found_g, gy, ly)
+        gh = np.where(found_g, gh, lh)
+
+    if is_rev: gh = gh + math.pi
+
+    seg_t.append(current_t + DT * np.arange(steps))
+    seg_x.append(gx); seg_y.append(gy); seg_h.append(gh)
+    current_t += steps * DT
 
     # === 关键：处理与下一条路的间隙 (Gap Filling) ===
     if i < len(road_configs) - 1:
@@ -160,11 +179,12 @@ for i in range(len(road_configs)):
             gap_time = gap_dist / speed_mps
             gap_steps = int(gap_time / DT)
             
-            for g_step in range(1, gap_steps + 1): # 留头不留尾
-                t_ratio = g_step / (gap_steps + 1)
-                bx, by, bh = bezier_interp(p_curr_end, p_next_start, t_ratio)
-                vut_points.append({'t': current_t, 'x': bx, 'y': by, 'h': bh})
-                current_t += DT
+            # 留头不留尾：整个间隙的插值参数一次喂给贝塞尔，控制点也只推算一次
+            t_ratio = np.arange(1, gap_steps + 1) / (gap_steps + 1)
+            bx, by, bh = bezier_interp(p_curr_end, p_next_start, t_ratio)
+            seg_t.append(current_t + DT * np.arange(gap_steps))
+            seg_x.append(bx); seg_y.append(by); seg_h.append(bh)
+            current_t += gap_steps * DT
 
 # ================= 生成目标车 (手动指定位置) =================
 
@@ -179,42 +199,44 @@ manual_h_rad = math.radians(manual_h_deg)
 # 3. 锁定位置
 best_t_pt = (manual_x, manual_y, manual_h_rad)
 
-# 4. 生成轨迹点 (保持静止)
-target_points = []
-for p in vut_points:
-    # 每一帧都呆在同一个位置
-    target_points.append({
-        't': p['t'], 
-        'x': best_t_pt[0], 
-        'y': best_t_pt[1], 
-        'h': best_t_pt[2]
-    })
+# 拼装 VUT 完整轨迹 (SoA)
+vut = Trajectory(
+    t=np.concatenate(seg_t),
+    x=np.concatenate(seg_x),
+    y=np.concatenate(seg_y),
+    h=np.concatenate(seg_h)
+)
+
+# 4. 生成轨迹点 (保持静止)：目标车每一帧呆在同一个位置，坐标列直接整列填充
+target = Trajectory(
+    t=vut.t,
+    x=np.full_like(vut.t, best_t_pt[0]),
+    y=np.full_like(vut.t, best_t_pt[1]),
+    h=np.full_like(vut.t, best_t_pt[2])
+)
 
 # ================= 保存 =================
-def save_f(fname, data):
+def save_f(fname, traj):
+    # 整块文本拼好后一次写盘，省掉每个 Vertex 三次小 write
     with open(fname, 'w') as f:
-        for p in data:
-            f.write(f'<Vertex time="{p["t"]:.4f}">\n')
-            f.write(f'    <Position><WorldPosition x="{p["x"]:.4f}" y="{p["y"]:.4f}" z="0" h="{p["h"]:.4f}"/></Position>\n')
-            f.write('</Vertex>\n')
+        f.write(''.join(
+            f'<Vertex time="{t:.4f}">\n'
+            f'    <Position><WorldPosition x="{x:.4f}" y="{y:.4f}" z="0" h="{h:.4f}"/></Position>\n'
+            '</Vertex>\n'
+            for t, x, y, h in zip(traj.t, traj.x, traj.y, traj.h)))
     print(f"已生成: {fname}")
 
-save_f(OUTPUT_VUT, vut_points)
-save_f(OUTPUT_TARGET, target_points)
+save_f(OUTPUT_VUT, vut)
+save_f(OUTPUT_TARGET, target)
 
-# 计算最小会车距离
-best_dist = float('inf')
-for p in vut_points:
-    dist = math.sqrt((p['x'] - best_t_pt[0])**2 + (p['y'] - best_t_pt[1])**2)
-    if dist < best_dist:
-        best_dist = dist
+# 计算最小会车距离：平方距离整列归约，只对最小值开一次方
+d2 = (vut.x - best_t_pt[0])**2 + (vut.y - best_t_pt[1])**2
+best_dist = math.sqrt(d2.min())
 print(f"完成。最终会车距离: {best_dist:.2f}m")
 
 # 绘图
 plt.figure(figsize=(6,6))
-px = [p['x'] for p in vut_points]
-py = [p['y'] for p in vut_points]
-plt.plot(px, py, 'b.-', label='VUT (Smoothed)')
+plt.plot(vut.x, vut.y, 'b.-', label='VUT (Smoothed)')
 plt.plot(best_t_pt[0], best_t_pt[1], 'ro', label='Target')
 plt.axis('equal')
 plt.legend()
@@ -1,10 +1,11 @@
-import xml.etree.ElementTree as ET
+from lxml import etree
+from collections import defaultdict
 import os
 
 def extract_professional(input_file, output_file, seed_road_ids):
     print(f"正在加载原始文件: {input_file} ...")
     try:
-        tree = ET.parse(input_file)
+        tree = etree.parse(input_file)
         root = tree.getroot()
     except Exception as e:
         print(f"文件解析失败: {e}")
@@ -17,34 +18,32 @@ def extract_professional(input_file, output_file, seed_road_ids):
     # 2. 智能确定提取范围 (Expansion Logic)
     #    规则：从用户指定的种子ID出发，如果该路属于某个 Junction，则必须提取该 Junction 下的所有路
     extraction_road_ids = set(str(x) for x in seed_road_ids)
-    involved_junction_ids = set()
 
-    # 第一轮扫描：找出涉及的路口
-    for rid in list(extraction_road_ids):
-        if rid in all_roads:
-            road = all_roads[rid]
-            jid = road.get('junction')
-            if jid and jid != "-1":
-                involved_junction_ids.add(jid)
-    
-    # 第二轮扫描：将涉及路口下的所有路全部加入提取列表
+    # 先各建一次反向索引：road → 所属 junction，junction → 其下所有 connectingRoad，
+    # 闭包展开就变成纯 set 运算，不再对种子逐个回查 all_roads
+    road_to_junction = {rid: r.get('junction') for rid, r in all_roads.items()
+                        if r.get('junction') not in (None, "-1")}
+    junction_roads = defaultdict(list)
+    for jid, junction in all_junctions.items():
+        for connection in junction.findall('connection'):
+            con_road = connection.get('connectingRoad')
+            if con_road:
+                junction_roads[jid].append(con_road)
+
+    # 种子涉及的路口，以及这些路口下的所有路
+    involved_junction_ids = {road_to_junction[rid] for rid in extraction_road_ids
+                             if rid in road_to_junction}
     print(f"检测到涉及的路口 ID: {involved_junction_ids}")
     for jid in involved_junction_ids:
-        if jid in all_junctions:
-            junction = all_junctions[jid]
-            # 遍历该 junction 下的所有 connection，找出相关的 connectingRoad
-            for connection in junction.findall('connection'):
-                con_road = connection.get('connectingRoad')
-                if con_road:
-                    extraction_road_ids.add(con_road)
-    
+        extraction_road_ids.update(junction_roads.get(jid, ()))
+
     print(f"根据路口完整性原则，道路提取数量修正为: {len(extraction_road_ids)} 条")
 
     # 3. 构建新的 OpenDRIVE 结构
-    new_root = ET.Element('OpenDRIVE')
-    
+    new_root = etree.Element('OpenDRIVE')
+
     # --- 关键修复：Header ---
-    # 直接复制原始 Header 节点，但在写入时需要特殊处理 CDATA
+    # 直接复制原始 Header 节点；GeoReference 的 CDATA 在树内直接修复 (见下)
     header = root.find('header')
     if header is not None:
         new_root.append(header)
@@ -61,6 +60,8 @@ def extract_professional(input_file, output_file, seed_road_ids):
         # 如果连接指向了 extraction_road_ids 以外的路，必须删除这个引用，否则 Esmini 会报错
         link = road.find('link')
         if link is not None:
+            # 先标记再统一删除，不在遍历中改动子节点列表
+            to_drop = []
             for tag in ['predecessor', 'successor']:
                 item = link.find(tag)
                 if item is not None and item.get('elementType') == 'road':
@@ -68,7 +69,9 @@ def extract_professional(input_file, output_file, seed_road_ids):
                     if target_id not in extraction_road_ids:
                         # 这是一个通向外部的连接 -> 熔断它
                         # print(f"  [边界熔断] Road {rid} -> {target_id} ({tag})")
-                        link.remove(item)
+                        to_drop.append(item)
+            for item in to_drop:
+                link.remove(item)
         
         new_root.append(road)
         count_roads += 1
@@ -81,46 +84,19 @@ def extract_professional(input_file, output_file, seed_road_ids):
             count_junctions += 1
 
     # 6. 保存文件 (特殊处理 GeoReference CDATA)
-    # 默认的 write 会转义 < 和 >，导致 <![CDATA[...]]> 变成 &lt;...&gt;，这是 Esmini 报错的主因
-    # 我们先生成字符串，然后手动修复 Header
-    
-    # 粗略生成的 XML 字符串
-    rough_string = ET.tostring(new_root, encoding='utf-8').decode('utf-8')
-    
-    # 原始文件中的 GeoReference 文本 (通常包含 CDATA)
-    original_geo_ref = ""
-    orig_geo_elem = root.find('.//geoReference')
-    if orig_geo_elem is not None:
-         # ElementTree 读取时会剥离 CDATA 标签，我们需要手动加回去
-         # 或者更简单：直接用字符串替换修复
-         pass
+    # 读取时 CDATA 标签被剥掉，写回前直接在树内用 lxml 的 etree.CDATA 还原，
+    # 不再把整棵树序列化成大字符串后用正则全文扫描替换
+    geo_elem = new_root.find('.//geoReference')
+    if geo_elem is not None:
+        proj_str = "+proj=tmerc +lon_0=121.2092870660126 +lat_0=31.292829882838856 +ellps=WGS84"
+        if geo_elem.text:
+            proj_str = geo_elem.text.strip()
+        geo_elem.text = etree.CDATA(proj_str)
 
-    # 由于 Python XML 库对 CDATA 支持不佳，我们采用“后处理”方式修复 Header
-    # 1. 找到生成的 <geoReference>...</geoReference>
-    # 2. 替换为标准的 CDATA 格式
-    
-    import re
-    # 匹配生成的 geoReference 内容 (可能被转义了)
-    # 比如 <geoReference>+proj=tmerc...</geoReference>
-    # 我们要把它变成 <geoReference><![CDATA[+proj=tmerc...]]></geoReference>
-    
-    # 获取原始投影字符串
-    proj_str = "+proj=tmerc +lon_0=121.2092870660126 +lat_0=31.292829882838856 +ellps=WGS84"
-    if orig_geo_elem is not None and orig_geo_elem.text:
-        proj_str = orig_geo_elem.text.strip()
-
-    # 替换
     # 注意：生成的 XML 可能包含 <?xml ...?> 头，我们需要加上
-    final_xml_str = '<?xml version="1.0" standalone="yes"?>\n' + rough_string
-    
-    # 修复 GeoReference: 简单暴力的字符串替换，确保格式绝对正确
-    # 找到 <geoReference> 标签的位置
-    pattern = re.compile(r'<geoReference>.*?</geoReference>', re.DOTALL)
-    cdata_geo = f"<geoReference><![CDATA[{proj_str}]]></geoReference>"
-    final_xml_str = re.sub(pattern, cdata_geo, final_xml_str)
-    
-    with open(output_file, "w", encoding="utf-8") as f:
-        f.write(final_xml_str)
+    with open(output_file, "wb") as f:
+        f.write(b'<?xml version="1.0" standalone="yes"?>\n')
+        f.write(etree.tostring(new_root, encoding='utf-8', xml_declaration=False))
 
     print("-" * 30)
     print(f"提取完成: {output_file}")
@@ -1,5 +1,17 @@
 import math
 import os
+import numpy as np
+from collections import namedtuple
+from numba import njit
+
+# 预编译的采样核 (python build_sampler.py 生成)：有则免去 JIT 预热
+try:
+    import sampler as _aot_sampler
+except ImportError:
+    _aot_sampler = None
+
+# 整条轨迹的 SoA 存储：四个平行数组，代替逐点字典
+Trajectory = namedtuple('Trajectory', ['t', 'x', 'y', 'h'])
 
 # ================= 配置区域 =================
 # 输出文件名
@@ -35,6 +47,7 @@ roads_db = {
 
 # ================= 核心计算逻辑 =================
 
+@njit(cache=True)
 def calc_point_on_arc(x0, y0, h0, s, k):
     """ 计算圆弧/直线上某一点的坐标 """
     if abs(k) < 1e-6:
@@ -49,6 +62,45 @@ def calc_point_on_arc(x0, y0, h0, s, k):
         y = y0 + (math.cos(h0) - math.cos(h)) / k
     return x, y, h
 
+# ---- 按路特化的采样函数 (运行时代码生成, 部分求值) ----
+# roads_db 在导入时就定死了：把每段的 x0/y0/h0/k 连同 sin/cos 折叠成字面量，
+# 生成一段向量化源码 exec 一次后缓存。没有预编译 sampler 模块时走这条路，
+# 零预热 (取代了原来的 @njit 兜底核)。
+
+_sampler_cache = {}
+
+def make_sampler(road_id):
+    """ 为单条路生成特化采样函数并缓存；几何内容进缓存键，改了自动重生成 """
+    segs = roads_db[road_id]
+    key = (road_id, tuple(tuple(s) for s in segs))
+    fn = _sampler_cache.get(key)
+    if fn is not None:
+        return fn
+
+    src = ["def _road_sampler(speed_mps, dt, counts, starts, out_t, out_x, out_y, out_h):"]
+    for j, (s_start, x0, y0, h0, length, k) in enumerate(segs):
+        src.append(f"    n = counts[{j}]; base = starts[{j}]; t0 = base * dt")
+        src.append("    i = np.arange(n)")
+        src.append("    ds = speed_mps * (i * dt)")
+        src.append("    out_t[base:base+n] = t0 + dt * i")
+        if abs(k) < 1e-6:
+            # 直线模型
+            src.append(f"    out_x[base:base+n] = {x0!r} + ds * {math.cos(h0)!r}")
+            src.append(f"    out_y[base:base+n] = {y0!r} + ds * {math.sin(h0)!r}")
+            src.append(f"    out_h[base:base+n] = {h0!r}")
+        else:
+            # 圆弧模型
+            src.append(f"    h = {h0!r} + ds * {k!r}")
+            src.append(f"    out_x[base:base+n] = {x0!r} + (np.sin(h) - {math.sin(h0)!r}) / {k!r}")
+            src.append(f"    out_y[base:base+n] = {y0!r} + ({math.cos(h0)!r} - np.cos(h)) / {k!r}")
+            src.append("    out_h[base:base+n] = h")
+
+    ns = {}
+    exec("\n".join(src), {"np": np}, ns)
+    fn = ns["_road_sampler"]
+    _sampler_cache[key] = fn
+    return fn
+
 def sample_road_geometry(road_id, step_size=1.0):
     """ 对某条路进行离散化采样 """
     segments = roads_db[road_id]
@@ -56,67 +108,66 @@ def sample_road_geometry(road_id, step_size=1.0):
     
     for seg in segments:
         s_start, x0, y0, h0, length, k = seg
+        # h0 是段常量：sin/cos 每段只算一次，逐点只剩 h 的一对三角函数
+        s0 = math.sin(h0); c0 = math.cos(h0)
+        straight = abs(k) < 1e-6
         # 在该段几何内采样
         num_steps = int(length / step_size) + 1
         for i in range(num_steps):
             ds = i * step_size
             if ds > length: ds = length
-            
-            px, py, ph = calc_point_on_arc(x0, y0, h0, ds, k)
-            points.append((px, py, ph))
-            
+
+            if straight:
+                points.append((x0 + ds * c0, y0 + ds * s0, h0))
+            else:
+                ph = h0 + ds * k
+                points.append((x0 + (math.sin(ph) - s0) / k,
+                               y0 + (c0 - math.cos(ph)) / k, ph))
+
     return points
 
 def generate_continuous_path(road_id_sequence, speed_mps, dt):
     """ 生成连续的时间-空间轨迹点 """
-    traj_points = []
-    current_time = 0.0
-    
-    for rid in road_id_sequence:
-        segments = roads_db[rid]
-        
-        # 遍历该路的所有几何段
-        for seg in segments:
-            s_local_start, x0, y0, h0, length, k = seg
-            
-            # 在当前路段上行驶的时间
-            duration = length / speed_mps
-            num_steps = int(duration / dt)
-            
-            for i in range(num_steps):
-                ds = speed_mps * (i * dt) # 当前段走过的距离
-                px, py, ph = calc_point_on_arc(x0, y0, h0, ds, k)
-                
-                # 转换 heading 到角度 (0-360 或 -180-180)
-                # h_deg = math.degrees(ph) % 360
-                h_rad = ph # 保持弧度供后续写入（如果需要角度再转）
-                
-                traj_points.append({
-                    'time': current_time,
-                    'x': px, 'y': py, 'h': ph
-                })
-                current_time += dt
-                
-    return traj_points
+    # 每段的步数与写入偏移先算好，单次分配输出数组后整批交给并行采样核
+    segs_arr = np.array([seg for rid in road_id_sequence for seg in roads_db[rid]])
+    counts = (segs_arr[:, 4] / speed_mps / dt).astype(np.int64)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    total = int(counts.sum())
+    # 注意保持 float64：坐标量级 ~360、输出格式 .6f，共 9 位有效数字，
+    # 超出 float32 的 ~7 位 (实测降成 float32 会把 -360.844000 写成 -360.843994)
+    t_arr = np.empty(total); x_arr = np.empty(total)
+    y_arr = np.empty(total); h_arr = np.empty(total)
+
+    if _aot_sampler is not None:
+        _aot_sampler.sample_all(segs_arr, starts, counts, dt, speed_mps,
+                                t_arr, x_arr, y_arr, h_arr)
+    else:
+        off = 0
+        for rid in road_id_sequence:
+            nseg = len(roads_db[rid])
+            make_sampler(rid)(speed_mps, dt, counts[off:off + nseg],
+                              starts[off:off + nseg], t_arr, x_arr, y_arr, h_arr)
+            off += nseg
+
+    return Trajectory(t=t_arr, x=x_arr, y=y_arr, h=h_arr)
 
 # ================= 主程序 =================
 
-def write_trajectory_file(filename, points):
-    with open(filename, 'w', encoding='utf-8') as f:
-        for p in points:
-            t = p['time']
-            x = p['x']
-            y = p['y']
-            h = p['h']
-            
-            f.write(f'<Vertex time="{t:.6f}">\n')
-            f.write('    <Position>\n')
-            # h 输出为弧度或角度？OpenDRIVE通常用弧度，ESMINI/OpenScenario有时用弧度
-            # 这里直接输出弧度值
-            f.write(f'        <WorldPosition x="{x:.6f}" y="{y:.6f}" z="0" h="{h:.6f}" p="0" r="0"/>\n')
-            f.write('    </Position>\n')
-            f.write('</Vertex>\n')
-    print(f"已生成: {filename} ({len(points)} 个点)")
+# h 输出为弧度或角度？OpenDRIVE通常用弧度，ESMINI/OpenScenario有时用弧度
+# 这里直接输出弧度值
+VERTEX_TEMPLATE = (b'<Vertex time="%.6f">\n'
+                   b'    <Position>\n'
+                   b'        <WorldPosition x="%.6f" y="%.6f" z="0" h="%.6f" p="0" r="0"/>\n'
+                   b'    </Position>\n'
+                   b'</Vertex>\n')
+
+def write_trajectory_file(filename, traj):
+    # % 格式化 + writelines：整个格式化循环都走 C 层，不再逐点进 Python。
+    # 内容纯 ASCII，直接按字节模板写二进制，省掉逐行 UTF-8 编码
+    with open(filename, 'wb') as f:
+        f.writelines(map(VERTEX_TEMPLATE.__mod__,
+                         zip(traj.t, traj.x, traj.y, traj.h)))
+    print(f"已生成: {filename} ({traj.t.size} 个点)")
 
 if __name__ == "__main__":
     # 1. 准备参数
@@ -124,33 +175,31 @@ if __name__ == "__main__":
     
     # 2. 生成 VUT 轨迹 (96 -> 197 -> 100 -> 101)
     vut_path_ids = ['96', '197', '100', '101']
-    vut_points = generate_continuous_path(vut_path_ids, speed_mps, DT)
-    
+    vut = generate_continuous_path(vut_path_ids, speed_mps, DT)
+
     # 3. 生成 Target 轨迹 (178 上静止)
     # 我们把静止车放在 178 的第二段开始处 (坐标约 -356, 88)，这里离 101 的终点很近
     target_seg = roads_db['178'][1] # 取第二段
     tx, ty, th = calc_point_on_arc(target_seg[1], target_seg[2], target_seg[3], 0.0, target_seg[5])
-    
-    target_points = []
-    # 目标车的时间长度与主车一致
-    total_time = vut_points[-1]['time']
+
+    # 目标车的时间长度与主车一致 (SoA 数组按已知长度预分配)
+    total_time = vut.t[-1]
     num_steps = int(total_time / DT)
-    
-    for i in range(num_steps + 1):
-        t = i * DT
-        target_points.append({
-            'time': t,
-            'x': tx, 'y': ty, 'h': th
-        })
-        
+
+    tgt_t = np.arange(num_steps + 1) * DT
+    target = Trajectory(t=tgt_t,
+                        x=np.full_like(tgt_t, tx),
+                        y=np.full_like(tgt_t, ty),
+                        h=np.full_like(tgt_t, th))
+
     # 4. 写入文件
-    write_trajectory_file(OUTPUT_VUT, vut_points)
-    write_trajectory_file(OUTPUT_TARGET, target_points)
-    
+    write_trajectory_file(OUTPUT_VUT, vut)
+    write_trajectory_file(OUTPUT_TARGET, target)
+
     print("\n完成！")
-    print(f"主车 (VUT) 最终位置: x={vut_points[-1]['x']:.2f}, y={vut_points[-1]['y']:.2f}")
-    print(f"目标车 (Target) 位置: x={target_points[0]['x']:.2f}, y={target_points[0]['y']:.2f}")
-    
+    print(f"主车 (VUT) 最终位置: x={vut.x[-1]:.2f}, y={vut.y[-1]:.2f}")
+    print(f"目标车 (Target) 位置: x={target.x[0]:.2f}, y={target.y[0]:.2f}")
+
     # 简单的距离检查
-    dist = math.sqrt((vut_points[-1]['x'] - tx)**2 + (vut_points[-1]['y'] - ty)**2)
+    dist = math.hypot(vut.x[-1] - tx, vut.y[-1] - ty)
     print(f"最终两车距离: {dist:.2f} 米 (如果小于5米则说明成功会面)")
\ No newline at end of file
@@ -0,0 +1,145 @@
+"""VT1 轨迹计算的公共核心：XML 提取 / 运动学 JIT 核 / XOSC 输出。
+
+各 VT1accTrajectory 入口脚本只负责配置起点与参数，计算逻辑集中在这里，
+@njit(cache=True) 的编译缓存也因此可以在多个入口间共享。
+"""
+from lxml import etree
+from dataclasses import dataclass
+import io
+import math
+import numpy as np
+from numba import njit, prange
+
+# stage 编码 → 显示名
+STAGE_NAMES = ("加速中", "匀速")
+
+@dataclass
+class Traj:
+    """轨迹的 SoA 存储：每个字段一个平行的 NumPy 数组，代替逐点字典"""
+    t: np.ndarray      # 时间 (s, 已按输出精度取整)
+    x: np.ndarray
+    y: np.ndarray
+    h: np.ndarray      # 航向 (弧度)
+    v: np.ndarray      # 速度 (m/s)
+    acc: np.ndarray    # 加速度 (m/s^2)
+    stage: np.ndarray  # int8, 索引 STAGE_NAMES
+
+def point_dict(traj, i):
+    """取单点转为旧字典形式 (预览打印用)"""
+    return {
+        "time": round(float(traj.t[i]), 3),
+        "x": float(traj.x[i]),
+        "y": float(traj.y[i]),
+        "heading": round(math.degrees(float(traj.h[i])), 2),
+        "h_rad": float(traj.h[i]),
+        "velocity": round(float(traj.v[i]), 2),
+        "acc": float(traj.acc[i]),
+        "stage": STAGE_NAMES[traj.stage[i]]
+    }
+
+@njit(cache=True)
+def compute_kin(cum, acc_dist, acc, target_v, acc_time):
+    """根据累积距离数组计算 (时间, 速度, 阶段) 数组。stage: 0=加速中, 1=匀速"""
+    t = np.empty_like(cum)
+    v = np.empty_like(cum)
+    stage = np.empty(cum.size, np.int8)
+    for i in range(cum.size):
+        d = cum[i]
+        if d <= acc_dist:
+            t[i] = math.sqrt(2 * d / acc)
+            v[i] = acc * t[i]
+            stage[i] = 0
+        else:
+            t[i] = acc_time + (d - acc_dist) / target_v
+            v[i] = target_v
+            stage[i] = 1
+    return t, v, stage
+
+@njit(parallel=True, fastmath=True, cache=True)
+def kinematics(xs, ys, acc, target_v, acc_dist, acc_time, t0):
+    """坐标数组 → (时间, 速度, 加速度, 阶段) 数组的融合核。
+
+    段长用 prange 并行算，前缀和串行，逐点运动学再并行一遍。
+    acc_dist <= 0 表示起步即已达目标速度（纯匀速段）。
+    """
+    n = xs.size
+    seg = np.empty(n - 1)
+    for i in prange(n - 1):
+        dx = xs[i + 1] - xs[i]
+        dy = ys[i + 1] - ys[i]
+        seg[i] = math.sqrt(dx * dx + dy * dy)
+    cum = np.empty(n)
+    cum[0] = 0.0
+    for i in range(1, n):
+        cum[i] = cum[i - 1] + seg[i - 1]
+    t = np.empty(n)
+    v = np.empty(n)
+    a = np.empty(n)
+    stage = np.empty(n, np.int8)
+    for i in prange(n):
+        d = cum[i]
+        if acc_dist > 0.0 and d <= acc_dist:
+            ti = math.sqrt(2 * d / acc)
+            t[i] = t0 + ti
+            v[i] = acc * ti
+            a[i] = acc
+            stage[i] = 0
+        else:
+            t[i] = t0 + acc_time + (d - max(acc_dist, 0.0)) / target_v
+            v[i] = target_v
+            a[i] = 0.0
+            stage[i] = 1
+    return t, v, a, stage
+
+def extract_vertices(xosc_file, target_name):
+    """SAX 式流式提取：进入目标 Trajectory 后直接收集 WorldPosition 属性，
+    全程不保留任何子树，峰值内存与文件大小无关"""
+    points = []
+    other_names = []
+    found_name = None
+    in_target = False
+    context = etree.iterparse(xosc_file, events=('start', 'end'))
+    for event, elem in context:
+        tag = elem.tag
+        if not isinstance(tag, str):
+            continue
+        if event == 'start':
+            if tag.endswith('Trajectory'):
+                name = elem.get('name')
+                if name and target_name in name:
+                    found_name = name
+                    in_target = True
+                elif name and 'Trajectory' in name:
+                    other_names.append(name)
+            continue
+        # end 事件：目标轨迹内的 WorldPosition 直接取属性
+        if in_target and tag.endswith('WorldPosition'):
+            try:
+                points.append((float(elem.get('x')),
+                               float(elem.get('y')),
+                               float(elem.get('h'))))
+            except (TypeError, ValueError):
+                pass
+        if in_target and tag.endswith('Trajectory'):
+            break  # 目标轨迹收集完毕，提前停止解析
+        # 丢弃已处理的元素并删除之前的兄弟节点，保持内存平坦
+        elem.clear()
+        while elem.getprevious() is not None:
+            del elem.getparent()[0]
+    del context
+    return found_name, points, other_names
+
+def emit_xosc(traj, output_file, echo=True):
+    """把轨迹写成 XOSC Vertex 片段；echo=True 时同步打印每个 Vertex"""
+    # 单一模板 + StringIO 缓冲：只遍历一次，最后一次性写盘
+    buf = io.StringIO()
+    fmt = ('<Vertex time="{:.4f}">\n'
+           '    <Position><WorldPosition x="{:.4f}" y="{:.4f}" z="0" h="{:.4f}"/></Position>\n'
+           '</Vertex>\n').format
+    for t, x, y, h in zip(traj.t, traj.x, traj.y, traj.h):
+        vertex_str = fmt(t, x, y, h)
+        buf.write(vertex_str)
+        if echo:
+            print(vertex_str, end='')
+    with open(output_file, 'w', encoding='utf-8') as f:
+        f.write(buf.getvalue())
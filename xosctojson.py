@@ -1,11 +1,50 @@
-import xml.etree.ElementTree as ET
-import json
+from lxml import etree
+import orjson
 import math
 import time
+import numpy as np
 
 def parse_xosc_to_json(xosc_file, output_file):
-    tree = ET.parse(xosc_file)
-    root = tree.getroot()
+    # 流式解析：单遍 iterparse 按 Trajectory 分组收集 Vertex 原始数值，
+    # 不在内存里保留整棵 DOM (与 vt1_traj_core 的提取方式一致)
+    raw_trajs = {}   # name -> (t, x, y, h 四个 list)
+    current = None
+    context = etree.iterparse(xosc_file, events=('start', 'end'))
+
+    # 从根节点探测一次命名空间，后面全部用精确标签名比较，
+    # 不再对每个节点做子串扫描
+    event, root = next(context)
+    ns = root.tag.split('}')[0][1:] if '}' in root.tag else ''
+    TRAJ_TAG = f'{{{ns}}}Trajectory' if ns else 'Trajectory'
+    VERT_TAG = f'{{{ns}}}Vertex' if ns else 'Vertex'
+    WP_PATH = f'.//{{{ns}}}WorldPosition' if ns else './/WorldPosition'
+
+    for event, elem in context:
+        tag = elem.tag
+        if event == 'start':
+            if tag == TRAJ_TAG:
+                name = elem.get('name')
+                if name:
+                    current = raw_trajs.setdefault(name, ([], [], [], []))
+            continue
+        if current is not None and tag == VERT_TAG:
+            wp = elem.find(WP_PATH)
+            if wp is not None:
+                # 只收集原始属性字符串，float 转换放到后面整列做
+                current[0].append(elem.get('time'))
+                current[1].append(wp.get('x'))
+                current[2].append(wp.get('y'))
+                current[3].append(wp.get('h'))
+            # 处理完即丢弃，并删掉之前的兄弟节点，保持内存平坦
+            elem.clear()
+            while elem.getprevious() is not None:
+                del elem.getparent()[0]
+        elif tag == TRAJ_TAG:
+            current = None
+            elem.clear()
+            while elem.getprevious() is not None:
+                del elem.getparent()[0]
+    del context
 
     # 1. 基础信息配置 (根据你的要求硬编码)
     json_data = {
@@ -33,83 +72,47 @@ def parse_xosc_to_json(xosc_file, output_file):
         "ped_content": []
     }
 
-    # 命名空间处理 (xosc通常有xmlns，处理起来比较麻烦，这里忽略命名空间直接查找)
-    # 为了简单，我们遍历所有元素查找名为 Vertex 的节点
-    
     # 辅助函数：将弧度转换为角度
     def rad_to_deg(rad):
         return float(rad) * (180 / math.pi)
 
-    # 辅助函数：处理单个实体的轨迹
+    # 辅助函数：处理单个实体的轨迹 (数据已在上面的流式遍历里收集好)
     def process_trajectory(entity_name, vehicle_id, static_velocity=None):
         traj_points = []
-        
-        # 在XML中查找对应实体的轨迹
-        # 逻辑：找到名为Trajectory且name包含entity_name的节点
-        target_traj_node = None
-        for traj in root.iter():
-            if 'Trajectory' in traj.tag and traj.get('name') == f"{entity_name}_Trajectory":
-                target_traj_node = traj
-                break
-        
-        if not target_traj_node:
+
+        raw = raw_trajs.get(f"{entity_name}_Trajectory")
+        if not raw or not raw[0]:
             print(f"Warning: No trajectory found for {entity_name}")
             return None
 
-        # 提取Vertex
-        vertices = []
-        for vertex in target_traj_node.iter():
-            if 'Vertex' in vertex.tag:
-                vertices.append(vertex)
-
-        # 转换为JSON格式的点
-        prev_x, prev_y, prev_t = None, None, None
-        
-        for i, vertex in enumerate(vertices):
-            t = float(vertex.get('time'))
-            pos_node = None
-            for child in vertex:
-                if 'Position' in child.tag:
-                    for wp in child:
-                        if 'WorldPosition' in wp.tag:
-                            pos_node = wp
-                            break
-            
-            if pos_node is None:
-                continue
-
-            x = float(pos_node.get('x'))
-            y = float(pos_node.get('y'))
-            h_rad = float(pos_node.get('h'))
-            heading = rad_to_deg(h_rad)
+        # 原始属性字符串整列转 ndarray，省掉逐 Vertex 的 float() 调用
+        n = len(raw[0])
+        t_arr, x_arr, y_arr, h_arr = (
+            np.fromiter(map(float, col), dtype=np.float64, count=n) for col in raw)
+
+        # 计算速度 (如果不是强制静态)：相邻点距离/时间差一次算完，首点保持 0
+        vel = np.zeros(n)
+        if static_velocity is not None:
+            vel[:] = static_velocity
+        elif n > 1:
+            dt_arr = np.diff(t_arr)
+            dist_arr = np.hypot(np.diff(x_arr), np.diff(y_arr))
+            safe_dt = np.where(dt_arr > 0, dt_arr, 1.0)
+            vel[1:] = np.where(dt_arr > 0, np.round(dist_arr / safe_dt, 2), 0.0)
 
-            # 计算速度 (如果不是强制静态)
-            velocity = 0.0
-            if static_velocity is not None:
-                velocity = static_velocity
-            elif prev_x is not None:
-                dist = math.sqrt((x - prev_x)**2 + (y - prev_y)**2)
-                dt = t - prev_t
-                if dt > 0:
-                    velocity = round(dist / dt, 2)
-            
-            # 第一个点的速度通常设为和第二个点一样，或者0
-            if i == 0 and len(vertices) > 1 and static_velocity is None:
-                # 预读下一个点算初速度
-                pass # 简化处理，保持0或者在下一个循环修正，这里保持0即可
-
-            point = {
+        # .tolist() 拿回 Python float，orjson 才能直接序列化
+        for t, x, y, h_rad, v in zip(t_arr.tolist(), x_arr.tolist(),
+                                     y_arr.tolist(), h_arr.tolist(), vel):
+            heading = rad_to_deg(h_rad)
+            traj_points.append({
                 "time": t,
                 "x": x,
                 "y": y,
                 "xyheading": round(heading, 2),
                 "heading": round(heading, 2),
-                "velocity": velocity,
+                "velocity": float(v),
                 "acc": 0.0 # XML中没有直接加速度数据，设为0
-            }
-            traj_points.append(point)
-            
-            prev_x, prev_y, prev_t = x, y, t
+            })
 
         # 构建车辆对象
         veh_obj = {
@@ -138,9 +141,9 @@ def parse_xosc_to_json(xosc_file, output_file):
     # 更新车辆总数
     json_data["veh_num"] = len(json_data["veh_content"])
 
-    # 4. 写入文件
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(json_data, f, indent=4, ensure_ascii=False)
+    # 4. 写入文件 (orjson 直接产出 utf-8 字节串，比标准库的 pretty-print 快好几倍)
+    with open(output_file, 'wb') as f:
+        f.write(orjson.dumps(json_data, option=orjson.OPT_INDENT_2))
     print(f"Successfully converted! Saved to {output_file}")
 
 # --- 执行转换 ---
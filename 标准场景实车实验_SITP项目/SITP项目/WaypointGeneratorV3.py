@@ -2,6 +2,7 @@ import tkinter as tk
 from tkinter import messagebox
 import matplotlib.pyplot as plt
 from matplotlib.patches import Rectangle
+from matplotlib.collections import LineCollection
 import numpy as np
 import os
 
@@ -13,6 +14,7 @@ class CollisionScenario:
         self.a_vehicle = 3.47   # Vehicle acceleration (m/s^2)
         self.a_pedestrian = 2.0 # Pedestrian acceleration (m/s^2)
         self.post_collision_distance = 2.5  # Pedestrian walks 2.5m after collision
+        self._bufs = None  # reusable trajectory arrays, sized on first use
 
     def validate_inputs(self):
         if not (3.5 <= self.ttc <= 4.5):
@@ -53,27 +55,33 @@ class CollisionScenario:
             'pedestrian': {'start': (ex, ey), 'trigger': (ax, ay), 'collision': (cx, cy)}
         }
 
+    def _trajectory_buffers(self, num_points):
+        # Re-plotting from the UI recomputes constantly; reuse one set of
+        # arrays and only reallocate when num_points changes
+        if self._bufs is None or self._bufs[0].size != num_points:
+            self._bufs = tuple(np.empty(num_points) for _ in range(6))
+        return self._bufs
+
     def generate_trajectory_points(self, num_points=200):
         self.validate_inputs()
         pos = self.calculate_positions()
+        (t_vals_v, vehicle_x, vehicle_y,
+         t_vals_p, pedestrian_x, pedestrian_y) = self._trajectory_buffers(num_points)
 
         # === Vehicle trajectory: acceleration + constant speed ===
         t_acc_v = self.v1 / self.a_vehicle
         d_fb = self.v1**2 / (2 * self.a_vehicle)
         d_bc = self.v1 * self.ttc
         total_vehicle_time = t_acc_v + self.ttc
-        t_vals_v = np.linspace(0, total_vehicle_time, num_points)
-
-        vehicle_x = []
-        vehicle_y = []
-        for t in t_vals_v:
-            if t <= t_acc_v:
-                x = pos['vehicle']['start'][0] + 0.5 * self.a_vehicle * t**2
-            else:
-                x_accel_end = pos['vehicle']['start'][0] + d_fb
-                x = x_accel_end + self.v1 * (t - t_acc_v)
-            vehicle_x.append(x)
-            vehicle_y.append(0.0)
+        t_vals_v[:] = np.linspace(0, total_vehicle_time, num_points)
+
+        # Both phases evaluated over the whole time array, branch picked by mask
+        start_x = pos['vehicle']['start'][0]
+        x_accel_end = start_x + d_fb
+        vehicle_x[:] = np.where(t_vals_v <= t_acc_v,
+                                start_x + 0.5 * self.a_vehicle * t_vals_v**2,
+                                x_accel_end + self.v1 * (t_vals_v - t_acc_v))
+        vehicle_y.fill(0.0)
 
         # === Pedestrian trajectory: acceleration + constant speed to C + post-collision walk ===
         t_acc_p = self.v2 / self.a_pedestrian
@@ -82,28 +90,22 @@ class CollisionScenario:
         t_post = self.post_collision_distance / self.v2  # time to walk 2.5m after C
 
         total_ped_time = t_acc_p + self.ttc + t_post
-        t_vals_p = np.linspace(0, total_ped_time, num_points)
-
-        pedestrian_x = []
-        pedestrian_y = []
-        for t in t_vals_p:
-            if t <= t_acc_p:
-                # Accelerating from E to A
-                y = pos['pedestrian']['start'][1] - 0.5 * self.a_pedestrian * t**2
-            elif t <= t_acc_p + self.ttc:
-                # Constant speed from A to C
-                y = d_ac - self.v2 * (t - t_acc_p)
-            else:
-                # After collision: continue downward (negative y) for 2.5m
-                y = -self.v2 * (t - t_acc_p - self.ttc)
-                if y < -self.post_collision_distance:
-                    y = -self.post_collision_distance
-            pedestrian_x.append(0.0)
-            pedestrian_y.append(y)
+        t_vals_p[:] = np.linspace(0, total_ped_time, num_points)
+
+        # Three phases (accelerate E->A, constant A->C, post-collision walk)
+        # selected per element; the 2.5m stop is a plain clamp
+        start_y = pos['pedestrian']['start'][1]
+        pedestrian_x.fill(0.0)
+        pedestrian_y[:] = np.select(
+            [t_vals_p <= t_acc_p, t_vals_p <= t_acc_p + self.ttc],
+            [start_y - 0.5 * self.a_pedestrian * t_vals_p**2,
+             d_ac - self.v2 * (t_vals_p - t_acc_p)],
+            default=np.maximum(-self.v2 * (t_vals_p - t_acc_p - self.ttc),
+                               -self.post_collision_distance))
 
         return {
-            'vehicle': (vehicle_x, vehicle_y),
-            'pedestrian': (pedestrian_x, pedestrian_y),
+            'vehicle': (list(vehicle_x), list(vehicle_y)),
+            'pedestrian': (list(pedestrian_x), list(pedestrian_y)),
             'vehicle_time': list(t_vals_v),
             'pedestrian_time': list(t_vals_p)
         }
@@ -149,14 +151,14 @@ class CollisionScenario:
             # Lane borders
             ax.plot([road_left, road_right], [-road_width/2, -road_width/2], 'k-', linewidth=1)
             ax.plot([road_left, road_right], [road_width/2, road_width/2], 'k-', linewidth=1)
-            # Center dashed line between two lanes
+            # Center dashed line between two lanes (one LineCollection, not one Line2D per dash)
             dash_x = np.linspace(road_left, road_right, 40)
-            for i in range(0, len(dash_x)-1, 2):
-                ax.plot([dash_x[i], dash_x[i+1]], [0, 0], color='white', linewidth=2)
+            dash_segs = [[(dash_x[i], 0), (dash_x[i+1], 0)] for i in range(0, len(dash_x)-1, 2)]
+            ax.add_collection(LineCollection(dash_segs, colors='white', linewidths=2))
 
             # Crosswalk at x=0
-            for y in np.arange(-1.5, 1.6, 0.5):
-                ax.plot([0, 0], [y - 0.25, y + 0.25], 'k-', linewidth=3)
+            cross_segs = [[(0, y - 0.25), (0, y + 0.25)] for y in np.arange(-1.5, 1.6, 0.5)]
+            ax.add_collection(LineCollection(cross_segs, colors='black', linewidths=3))
 
             # Trajectories
             ax.plot(traj['vehicle'][0], traj['vehicle'][1], 'b-', linewidth=2, label='Vehicle Trajectory')